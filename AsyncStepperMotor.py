@@ -17,7 +17,8 @@
 ####################################################################################
 #
 # Provides an asynchronous means of driving a stepper motor connected to an Adafruit
-# Stepper Motor Bonnet on a Raspberry Pi.
+# Stepper Motor Bonnet on a Raspberry Pi (or, alternatively, to a STEP/DIR stepper
+# driver such as a DRV8825 wired directly to the Raspberry Pi's GPIO pins).
 #
 ####################################################################################
 #
@@ -76,23 +77,66 @@
 #
 ####################################################################################
 
+import os
 import time
-import queue
+import mmap
+import struct
+import asyncio
 import logging
-
-import chronos
+import threading
+import collections
 
 from datetime import datetime
-from threading import Event
 
 from enum import Enum
 
-from concurrent.futures import ThreadPoolExecutor
-from time import sleep
-
 from adafruit_motorkit import MotorKit
 from adafruit_motor import stepper
 
+try:
+	import numpy
+
+except ImportError: # Optional. Only needed for ramped (accelerating) motion.
+	numpy = None
+
+####################################################################################
+#
+# class _CommandKind
+#
+####################################################################################
+
+class _CommandKind(Enum):
+	MOVE_TO = 1
+	MOVE_BY = 2
+	HALT = 3
+	MARK = 4
+	GOTO = 5
+	MOTION_UPDATE_INTERVAL = 6
+	IDLE_UPDATE_INTERVAL = 7
+	STEPPING_STYLE = 8
+	REVERSE_MOTION = 9
+	MOTION_STEP_DELAY = 10
+	MOTION_RAMP = 11
+	HOLD_AFTER_STOP = 12
+
+# How each kind of command describes itself (in logs), given its args. Formatted
+# only if and when actually needed.
+
+_DESC_FMTS = {
+	_CommandKind.MOVE_TO: "move to %s",
+	_CommandKind.MOVE_BY: "move by %s",
+	_CommandKind.HALT: "halt",
+	_CommandKind.MARK: "mark '%s'",
+	_CommandKind.GOTO: "go to '%s'",
+	_CommandKind.MOTION_UPDATE_INTERVAL: "motion update interval '%s'",
+	_CommandKind.IDLE_UPDATE_INTERVAL: "idle update interval '%s'",
+	_CommandKind.STEPPING_STYLE: "stepping style '%s'",
+	_CommandKind.REVERSE_MOTION: "reverse motion %s",
+	_CommandKind.MOTION_STEP_DELAY: "motion step delay %s",
+	_CommandKind.MOTION_RAMP: "motion ramp %s",
+	_CommandKind.HOLD_AFTER_STOP: "hold after stop %s"
+}
+
 ####################################################################################
 #
 # class _MotorCommand
@@ -101,15 +145,54 @@ from adafruit_motor import stepper
 
 class _MotorCommand:
 
-	def __init__(self, command, desc):
+	__slots__ = ('_kind', '_command', '_args')
+
+	def __init__(self, kind, command, args):
+		self._kind = kind
 		self._command = command
-		self._description = desc
+		self._args = args
 
 	def execute(self):
-		self._command()
+		self._command(*self._args)
 
-	def _str_(self):
-		return self._description
+	def __repr__(self):
+		return _DESC_FMTS[self._kind] % self._args
+
+####################################################################################
+#
+# class _CommandPool
+#
+####################################################################################
+
+class _CommandPool:
+
+	# A bounded free-list of _MotorCommand objects, so issuing a command doesn't
+	# allocate one. The deque's append()/pop() are atomic, so commands can be
+	# rented from client threads whilst being released from the event loop.
+
+	def __init__(self, size):
+		self._bag = collections.deque((_MotorCommand(None, None, None) for _ in range(size)), maxlen = size)
+
+	def rent(self, kind, command, args):
+
+		try:
+			slot = self._bag.pop()
+
+		except IndexError: # Exhausted, so fall back to allocating.
+			slot = _MotorCommand(None, None, None)
+
+		slot._kind = kind
+		slot._command = command
+		slot._args = args
+
+		return slot
+
+	def release(self, slot):
+
+		slot._command = None # Don't keep the bound method (nor its args) alive.
+		slot._args = None
+
+		self._bag.append(slot) # Beyond the pool size, the surplus is simply dropped.
 
 ####################################################################################
 #
@@ -123,6 +206,218 @@ class MotorSteppingStyle(Enum):
 	INTERLEAVE = stepper.INTERLEAVE
 	MICROSTEP = stepper.MICROSTEP
 
+####################################################################################
+#
+# _steppingStyleValue(steppingStyle)
+#
+####################################################################################
+
+def _steppingStyleValue(steppingStyle):
+
+	# Resolved once (rather than per step) to the plain value the motor library
+	# expects, whether given as one of the library's constants or as an enum.
+
+	return steppingStyle.value if isinstance(steppingStyle, Enum) else steppingStyle
+
+####################################################################################
+#
+# class _CoilLatch
+#
+####################################################################################
+
+class _CoilLatch:
+
+	# Stands in for a PCA9685 PWM channel, merely remembering the duty cycle
+	# written to it so that it can later be flushed to the device in bulk.
+
+	__slots__ = ('duty_cycle',)
+
+	def __init__(self):
+		self.duty_cycle = 0
+
+####################################################################################
+#
+# class _BatchedCoilStepper
+#
+####################################################################################
+
+class _BatchedCoilStepper:
+
+	# Wraps an Adafruit StepperMotor whose coils are driven by PCA9685 channels.
+	# The Adafruit library writes each coil's PWM registers in a separate I2C
+	# transaction (four per step). Here the coils are latched during onestep()
+	# and release(), and then only the channels that actually changed are sent
+	# to the PCA9685 as a single auto-incrementing block write.
+
+	_LED0_ON_L = 0x06 # PCA9685 register of channel 0. Each channel has 4 registers.
+
+	def __init__(self, stepperMotor):
+
+		coils = stepperMotor._coil
+		channels = tuple(coil._index for coil in coils)
+
+		if (sorted(channels) != list(range(min(channels), min(channels) + len(channels)))):
+			raise Exception(f"Coil channels {channels} are not contiguous.")
+
+		self._stepperMotor = stepperMotor
+		self._i2cDevice = coils[0]._pca.i2c_device
+		self._channels = channels
+
+		self._latches = tuple(_CoilLatch() for _ in coils)
+		self._prevDutyCycles = [None] * len(coils) # Unknown, so the first flush writes all.
+
+		stepperMotor._coil = self._latches # The library now writes to our latches.
+
+	def onestep(self, *, direction = stepper.FORWARD, style = stepper.SINGLE):
+
+		position = self._stepperMotor.onestep(direction = direction, style = style)
+		self._flush()
+
+		return position
+
+	def release(self):
+
+		self._stepperMotor.release()
+		self._flush()
+
+	def _flush(self):
+
+		changed = [
+			channel for (channel, latch, prevDutyCycle) in zip(self._channels, self._latches, self._prevDutyCycles)
+			if latch.duty_cycle != prevDutyCycle
+		]
+
+		if (not changed):
+			return
+
+		lowest = min(changed)
+		highest = max(changed)
+
+		# Our channels are contiguous, so every channel in the span is one of ours.
+
+		buffer = bytearray(1 + 4 * (highest - lowest + 1))
+		buffer[0] = self._LED0_ON_L + 4 * lowest
+
+		for (coilNo, channel) in enumerate(self._channels):
+
+			dutyCycle = self._latches[coilNo].duty_cycle
+			self._prevDutyCycles[coilNo] = dutyCycle
+
+			if (lowest <= channel <= highest):
+
+				# As per adafruit_pca9685.PWMChannel.duty_cycle (ON, OFF counts): fully
+				# on, fully off (never ON == OFF), or else the 12-bit OFF count.
+
+				if (dutyCycle == 0xFFFF):
+					onOff = (0x1000, 0)
+				elif (dutyCycle < 0x0010):
+					onOff = (0, 0x1000)
+				else:
+					onOff = (0, dutyCycle >> 4)
+				struct.pack_into('<HH', buffer, 1 + 4 * (channel - lowest), *onOff)
+
+		with self._i2cDevice as i2c:
+			i2c.write(buffer)
+
+####################################################################################
+#
+# class _GpioStepperBackend
+#
+####################################################################################
+
+class _GpioStepperBackend:
+
+	# Drives a STEP/DIR stepper driver (e.g. a DRV8825) by writing directly to the
+	# BCM283x GPIO registers via /dev/gpiomem. A step is then a couple of 32-bit
+	# register stores rather than an I2C transaction. Pins are BCM numbered (0-31).
+	# Microstepping is configured by the driver's mode pins, so the stepping style
+	# is ignored. The (optional) enable pin is taken to be active low.
+	#
+	# The driver has minimum timings between our register writes: STEP high and
+	# STEP low (DRV8825 >= 1.9us, A4988 >= 1us), and DIR setup before the STEP
+	# rising edge (DRV8825 >= 650ns, A4988 >= 200ns). These are busy-waited, as
+	# they're far too short to sleep for. Steps must also be no more frequent
+	# than the motor can follow (minStepPeriod), so steps are never burst.
+
+	_GPFSEL0 = 0x00 # Function select registers, 3 bits per pin, 10 pins per register.
+	_GPSET0 = 0x1C  # Output set register (pins 0-31).
+	_GPCLR0 = 0x28  # Output clear register (pins 0-31).
+
+	def __init__(self, stepPin, dirPin, enablePin = None,
+		pulseWidthSecs = 0.000002, dirSetupSecs = 0.000001, minStepPeriodSecs = 0.0005
+		):
+
+		if (dirPin is None):
+			raise Exception("A DIR pin is required when driving a STEP pin.")
+
+		fd = os.open('/dev/gpiomem', os.O_RDWR | os.O_SYNC)
+
+		try:
+			self._gpio = mmap.mmap(fd, 4096)
+		finally:
+			os.close(fd)
+
+		self._registers = memoryview(self._gpio).cast('I') # Whole-word register access.
+
+		for pin in (stepPin, dirPin, enablePin):
+			if (pin is not None):
+				self._makeOutput(pin)
+
+		self._stepMask = 1 << stepPin
+		self._dirMask = 1 << dirPin
+		self._enableMask = 0 if (enablePin is None) else (1 << enablePin)
+
+		self._pulseWidth = pulseWidthSecs # Both the STEP high and low times.
+		self._dirSetup = dirSetupSecs
+
+		self.minStepPeriod = max(minStepPeriodSecs, 2.0 * pulseWidthSecs) # Read by AsyncStepperMotor.
+
+		self._direction = None
+		self._enabled = False
+		self._stepLowAt = 0.0 # time.perf_counter() of the last STEP falling edge.
+
+	def onestep(self, *, direction = stepper.FORWARD, style = stepper.SINGLE):
+
+		registers = self._registers
+		clock = time.perf_counter
+
+		if (not self._enabled):
+			registers[self._GPCLR0 >> 2] = self._enableMask
+			self._enabled = True
+
+		# STEP must have been low long enough since the last pulse.
+
+		risingEdge = self._stepLowAt + self._pulseWidth
+
+		if (direction != self._direction): # DIR only needs writing upon a change.
+			registers[(self._GPSET0 if (direction == stepper.BACKWARD) else self._GPCLR0) >> 2] = self._dirMask
+			self._direction = direction
+			risingEdge = max(risingEdge, clock() + self._dirSetup) # Let DIR settle first.
+
+		while (clock() < risingEdge):
+			pass
+
+		registers[self._GPSET0 >> 2] = self._stepMask
+
+		pulseEnd = clock() + self._pulseWidth
+		while (clock() < pulseEnd):
+			pass
+
+		registers[self._GPCLR0 >> 2] = self._stepMask
+		self._stepLowAt = clock()
+
+	def release(self):
+
+		self._registers[self._GPSET0 >> 2] = self._enableMask
+		self._enabled = False
+
+	def _makeOutput(self, pin):
+
+		index = (self._GPFSEL0 >> 2) + (pin // 10)
+		shift = (pin % 10) * 3
+
+		self._registers[index] = (self._registers[index] & ~(0b111 << shift)) | (0b001 << shift)
+
 ####################################################################################
 #
 # class AsyncStepperMotor
@@ -131,13 +426,23 @@ class MotorSteppingStyle(Enum):
 
 class AsyncStepperMotor:
 
+	# For the steadiest step timing, the control loop's thread promotes itself to
+	# SCHED_FIFO real-time scheduling and pins itself to a single CPU (CPU 3 by
+	# default). That needs CAP_SYS_NICE (e.g. running as root) and, ideally, that
+	# CPU reserved for it by adding "isolcpus=3" to /boot/cmdline.txt. Without
+	# these, the control loop simply runs with normal scheduling. This applies only
+	# to the dedicated thread from start(); run() leaves its caller's thread as is.
+
 	################################################################################
 	#
-	# __init__(self, stepperNo , steppingStyle, loggingLevel)
+	# __init__(self, stepperNo , steppingStyle, loggingLevel, stepPin, dirPin, enablePin)
 	#
 	################################################################################
 
-	def __init__(self, stepperNo = 1, steppingStyle = stepper.DOUBLE, loggingLevel = logging.NOTSET):
+	def __init__(self,
+		stepperNo = 1, steppingStyle = stepper.DOUBLE, loggingLevel = logging.NOTSET,
+		stepPin = None, dirPin = None, enablePin = None
+		):
 
 		self._debugLevel = loggingLevel
 
@@ -152,26 +457,74 @@ class AsyncStepperMotor:
 		### gearingRatio = 63.68395
 		### stepsPerRev = motorStepsPerRev * gearingRatio
 
-		self._commandQueue = queue.Queue()  # Ready-baked thread-safe queue.
+		# The control loop runs as a coroutine on its own asyncio event loop. Commands
+		# are handed over to it from client threads by appending to the command queue
+		# (deque appends/pops are atomic) and then, via call_soon_threadsafe(),
+		# setting the single event the loop awaits whilst idle.
+		#
+		# Note that call_soon_threadsafe() writes to the event loop's self-pipe, so
+		# whilst idle, command arrival, stop requests and the report/release
+		# deadlines (as the select() timeout) are all awaited in one select() call.
+
+		self._loop = asyncio.new_event_loop()
+
+		self._commandQueue = collections.deque()
+		self._commandLock = threading.Lock() # Guards coalescing against the tail being popped.
+		self._commandEvent = None # asyncio.Event, created on the event loop itself.
+		self._commandPool = _CommandPool(64)
+
+		# Step pacing (seconds between steps). Zero still yields to the event loop
+		# between steps so that newly arrived commands get a look in. Steps are
+		# paced against absolute (time.monotonic()) deadlines so that oversleeping
+		# one step doesn't accumulate as drift over the whole motion.
+
+		self._stepPeriod = 0.0
+		self._minStepPeriod = 0.0 # The fastest the motor driver can be stepped.
+		self._nextStepTime = 0.0
+
+		# Optionally, motion can be ramped up to speed (and back down again) by
+		# adding up to this much extra delay to steps near either end of a motion.
+		# Each motion's per-step periods are precomputed (needs numpy) as a
+		# schedule, consumed a step at a time.
+
+		self._rampPeriod = 0.0
+		self._schedule = None
+		self._scheduleIndex = 0
+
+		# Once motion stops, the coils are held energised for a while (to settle,
+		# and so that rapid stop/start sequences don't lose steps) before being
+		# released so that the motor doesn't get toasty.
+
+		self._holdAfterStopSecs = 1.0
+
+		# When steps are unpaced (i.e. limited only by how long the motor driver
+		# takes over each), up to this many are taken per pass of the control loop,
+		# amortising the loop's overhead (command checks, reporting, etc.).
+
+		self._burstSize = 8
+		self._releaseDeadline = None # time.monotonic() at which to release, if pending.
+
+		# Real-time scheduling of the control loop's thread (see class comment).
+
+		self._realTimeCpu = 3
+		self._realTimePriority = 80
 
 		# Define our motion behaviour configuration.
 
-		self._motorSteppingStyle = steppingStyle
+		self._motorSteppingStyle = _steppingStyleValue(steppingStyle)
 		self._motorMotionReversed = False
 
-		# Motion progress reporting intervals and the countdown timers
-		# used to determine if those intervals have expired.
+		self._directions = (stepper.FORWARD, stepper.BACKWARD) # Indexed by "backwards?".
 
-		self._idlingReportInterval = 5.0 # seconds
-		self._idlingReportCountdownTimer = chronos.CountdownTimer(self._idlingReportInterval)
+		# Motion progress reporting intervals.
 
+		self._idlingReportInterval = 5.0 # seconds
 		self._motionReportInterval = 0.2 # seconds
-		self._motionReportCountdownTimer = chronos.CountdownTimer(self._motionReportInterval)
 
-		# The selected countdown time, depending upon whether the motor
-		# is in motion or not.
+		# The (time.monotonic()) time at which the next report is due, using
+		# whichever interval applies to whether the motor is in motion or not.
 
-		self._countdownTimer = self._idlingReportCountdownTimer
+		self._reportDeadline = time.monotonic() + self._idlingReportInterval
 
 		# A map of named (labelled) positions against their notional
 		# numeric position.
@@ -181,6 +534,9 @@ class AsyncStepperMotor:
 		# Motor position and request for change of motor position.
 		# We look for the target differing from the current state
 		# to trigger motion processing.
+		#
+		# Positions are always held as ints (commands coerce their
+		# arguments on arrival) so no casting is needed per step.
 
 		self._motorPosition = 0
 		self._targetMotorPosition = self._motorPosition
@@ -213,27 +569,64 @@ class AsyncStepperMotor:
 
 		self._lastSteadyStatePosition = 0
 
-		self._motionCompleteEvent = Event()
+		# A thread (not asyncio) event, as it's waited upon from client threads, and
+		# must still be usable when the event loop isn't running at all.
+
+		self._motionCompleteEvent = threading.Event()
 		self._motionCompleteEvent.set() # As not initially in motion.
 
-		self._waitCompleteEvent = Event()
-		self._waitCompleteEvent.set() # As not initially waiting.
+		# Set from start() (or run()) until the control loop exits, so wait() knows
+		# whether there's a loop to wait upon, even before it's actually running.
+
+		self._loopActiveEvent = threading.Event()
 
-		self._threadPool = ThreadPoolExecutor(1)
-		self._future = None
+		# Events must be created on the event loop they're to be used from (older
+		# Pythons bind them at construction). Being scheduled first, this runs before
+		# the signalling of any commands that were queued prior to the loop starting.
+
+		self._loop.call_soon(self._initialiseLoopState)
+
+		self._thread = None
+		self._stopTimeout = 2.0 # seconds
 		self._running = False
 		self._looping = True
 
-		# Initialisation of the underlying motor library. The Adafruit
-		# stepper motor bonnet supports up to two stepper motors. An
-		# instance of this class controls one or the other.
+		# If a STEP/DIR driver is wired directly to the GPIO header, then drive
+		# that, bypassing the Adafruit motor library (and I2C) entirely.
+
+		if (stepPin is not None):
+
+			self._kit = None
+			self._stepperMotor = _GpioStepperBackend(stepPin, dirPin, enablePin)
 
-		self._kit = MotorKit()
+			# Nothing else would pace these steps, so never step faster than the
+			# driver (and motor) can follow, and one step per pass, never a burst.
 
-		if (stepperNo < 1) or (stepperNo > 2):
-		    raise Exception(f'Invalid stepper number {stepperNo}')
+			self._minStepPeriod = self._stepperMotor.minStepPeriod
+			self._stepPeriod = self._minStepPeriod
+			self._burstSize = 1
 
-		self._stepperMotor = self._kit.stepper1 if stepperNo == 1 else self._kit.stepper1
+		else:
+
+			# Initialisation of the underlying motor library. The Adafruit
+			# stepper motor bonnet supports up to two stepper motors. An
+			# instance of this class controls one or the other.
+
+			self._kit = MotorKit()
+
+			if (stepperNo < 1) or (stepperNo > 2):
+			    raise Exception(f'Invalid stepper number {stepperNo}')
+
+			self._stepperMotor = self._kit.stepper1 if stepperNo == 1 else self._kit.stepper2
+
+			# Prefer batching the coil updates of each step into one I2C transaction,
+			# but fall back to the library's own per-coil writes if we can't.
+
+			try:
+				self._stepperMotor = _BatchedCoilStepper(self._stepperMotor)
+
+			except Exception as ex:
+				self._logger.warning("Batched coil writes unavailable, using per-coil writes: %s", ex)
 
 	################################################################################
 	#
@@ -243,13 +636,9 @@ class AsyncStepperMotor:
 
 	def moveBy(self, steps):
 
-		command = _MotorCommand(
-			lambda : self._moveBy(steps),
-			f"move by {steps}"
-		)
-
 		self._queueCommand(
-			command
+			_CommandKind.MOVE_BY,
+			self._moveBy, (steps,)
 		)
 
 	################################################################################
@@ -261,10 +650,8 @@ class AsyncStepperMotor:
 	def moveTo(self, position):
 
 		self._queueCommand(
-			_MotorCommand(
-				lambda : self._moveTo(position),
-				f"move to {position}"
-			)
+			_CommandKind.MOVE_TO,
+			self._moveTo, (position,)
 		)
 
 	################################################################################
@@ -276,10 +663,8 @@ class AsyncStepperMotor:
 	def halt(self):
 
 		self._queueCommand(
-			_MotorCommand(
-				lambda : self._halt(),
-				"halt"
-			)
+			_CommandKind.HALT,
+			self._halt, ()
 		)
 
 	################################################################################
@@ -291,10 +676,8 @@ class AsyncStepperMotor:
 	def mark(self, label):
 
 		self._queueCommand(
-			_MotorCommand(
-				lambda : self._mark(label),
-				f"mark '{label}'"
-			)
+			_CommandKind.MARK,
+			self._mark, (label,)
 		)
 
 	################################################################################
@@ -306,10 +689,8 @@ class AsyncStepperMotor:
 	def goto(self, label):
 
 		self._queueCommand(
-			_MotorCommand(
-				lambda : self._goto(label),
-				f"go to '{label}'"
-			)
+			_CommandKind.GOTO,
+			self._goto, (label,)
 		)
 
 	################################################################################
@@ -334,15 +715,16 @@ class AsyncStepperMotor:
 		# reached, or because a halt command has been issued (which is a case of
 		# a new foreshortened target having been reached)). Returns the final
 		# resting position of the motor.
+		#
+		# Must not be called from the event loop thread itself (e.g. from within
+		# an observer callback) as that would deadlock.
 
-		self._waitCompleteEvent.clear() # We're not complete, as we're waiting.
-
-		self._motionCompleteEvent.wait() # Wait for motion to complete (to stop)
-		pos = self._lastSteadyStatePosition 
+		if (not self._loopActiveEvent.is_set()): # Not started, or stopped, so can't be moving.
+			return self._lastSteadyStatePosition
 
-		self._waitCompleteEvent.set() # We're done waiting, so the vent loop can continue.
+		self._motionCompleteEvent.wait() # Wait for motion to complete (to stop).
 
-		return pos
+		return self._lastSteadyStatePosition
 
 	################################################################################
 	#
@@ -353,10 +735,8 @@ class AsyncStepperMotor:
 	def motionUpdateInterval(self, intervalSecs):
 
 		self._queueCommand(
-			_MotorCommand(
-				lambda : self._motionInterval(intervalSecs),
-				f"motion update interval '{intervalSecs}'"
-			)
+			_CommandKind.MOTION_UPDATE_INTERVAL,
+			self._setMotionReportInterval, (intervalSecs,)
 		)
 
 	################################################################################
@@ -368,10 +748,8 @@ class AsyncStepperMotor:
 	def idleUpdateInterval(self, intervalSecs):
 
 		self._queueCommand(
-			_MotorCommand(
-				lambda : self._idleUpdateInterval(intervalSecs),
-				f"idle update interval '{intervalSecs}'"
-			)
+			_CommandKind.IDLE_UPDATE_INTERVAL,
+			self._setIdleUpdateInterval, (intervalSecs,)
 		)
 
 	################################################################################
@@ -383,10 +761,8 @@ class AsyncStepperMotor:
 	def steppingStyle(self, steppingStyle):
 
 		self._queueCommand(
-			_MotorCommand(
-				lambda : self._steppingStyle(steppingStyle),
-				f"idle update interval '{_renderStepping(steppingStyle)}'"
-			)
+			_CommandKind.STEPPING_STYLE,
+			self._steppingStyle, (steppingStyle,)
 		)
 
 	################################################################################
@@ -398,10 +774,8 @@ class AsyncStepperMotor:
 	def reverseMotion(self, reversed):
 
 		self._queueCommand(
-			_MotorCommand(
-				lambda : self._reverseMotion(reversed),
-				f"reverse motion {reversed}"
-			)
+			_CommandKind.REVERSE_MOTION,
+			self._reverseMotion, (reversed,)
 		)
 
 	################################################################################
@@ -413,10 +787,34 @@ class AsyncStepperMotor:
 	def motionStepDelay(self, delaySecs):
 
 		self._queueCommand(
-			_MotorCommand(
-				lambda: self._motionStepDelay(delaySecs),
-				f"motion step delay {delaySecs}"
-			)
+			_CommandKind.MOTION_STEP_DELAY,
+			self._motionStepDelay, (delaySecs,)
+		)
+
+	################################################################################
+	#
+	# motionRamp(self, rampSecs)
+	#
+	################################################################################
+
+	def motionRamp(self, rampSecs):
+
+		self._queueCommand(
+			_CommandKind.MOTION_RAMP,
+			self._motionRamp, (rampSecs,)
+		)
+
+	################################################################################
+	#
+	# holdAfterStop(self, holdSecs)
+	#
+	################################################################################
+
+	def holdAfterStop(self, holdSecs):
+
+		self._queueCommand(
+			_CommandKind.HOLD_AFTER_STOP,
+			self._holdAfterStop, (holdSecs,)
 		)
 
 	####################################################################################
@@ -445,9 +843,8 @@ class AsyncStepperMotor:
 		if (not self._running):
 			raise NotImplementedError("Attempt to stop() when not running.")
 
-		self._running = False
-
-		self._stop()
+		if (self._stop()): # Otherwise its thread is still alive, so still running.
+			self._running = False
 
 	####################################################################################
 	#
@@ -473,10 +870,9 @@ class AsyncStepperMotor:
 
 	def tryStop(self) -> bool:
 
-		success = self._running
+		success = self._running and self._stop()
 
 		if (success):
-			self._stop()
 			self._running = False
 
 		return success
@@ -489,8 +885,10 @@ class AsyncStepperMotor:
 
 	def run(self):
 
+		self._loopActiveEvent.set()
+
 		try:
-			self._eventLoop()
+			self._loop.run_until_complete(self._eventLoop())
 
 		except KeyboardInterrupt:
 			self._logger.debug("*** Interrupted.")
@@ -498,6 +896,7 @@ class AsyncStepperMotor:
 		finally:
 			self._stepperMotor.release()
 			self._logger.debug("Released motor.")
+			self._loopActiveEvent.clear()
 			self._motionCompleteEvent.set() # Motion is now complete.
 
 	################################################################################
@@ -508,9 +907,21 @@ class AsyncStepperMotor:
 
 	def _start(self):
 
+		if (self._thread is not None) and self._thread.is_alive(): # A previous stop() failed.
+			raise Exception("Stepper motor controller thread from a previous run is still alive.")
+
 		self._logger.info("Stepper motor controller starting...")
 
-		self._future = self._threadPool.submit(self._eventLoop)
+		self._looping = True # Could have been stopped before.
+		self._loopActiveEvent.set() # Before the thread, so wait() can't miss the loop.
+
+		self._thread = threading.Thread(
+			target = self._runLoopThread,
+			name = 'StepperLoop',
+			daemon = True
+		)
+
+		self._thread.start()
 
 		self._logger.info("Stepper motor controller started.")
 
@@ -520,59 +931,116 @@ class AsyncStepperMotor:
 	#
 	################################################################################
 
-	def _stop(self):
+	def _stop(self) -> bool:
+
+		# Returns whether the controller's thread actually stopped. If it didn't,
+		# its event loop is still running, so it can't be started again.
 
 		self._logger.info("Stepper motor controller stopping...")
 
 		self._looping = False
+		self._loop.call_soon_threadsafe(self._signalCommandQueued) # Wake it, if idle.
 
-		while (not self._future.done()):
-			self._logger.debug("Waiting for stepper motor controller to stop...")
-			time.sleep(1)
+		self._thread.join(timeout = self._stopTimeout)
+
+		if (self._thread.is_alive()): # e.g. stuck in an observer callback.
+			self._logger.error("Stepper motor controller did not stop in time, so is still running.")
+			return False
 
 		self._logger.info("Stepper motor controller stopped.")
 
+		return True
+
 	################################################################################
 	#
-	# _eventLoop(self)
+	# _runLoopThread(self)
 	#
 	################################################################################
 
-	def _eventLoop(self):
+	def _runLoopThread(self):
+
+		# The body of our own dedicated thread, so only that thread (never a caller's
+		# own, as with run()) is given real-time priority and pinned to a CPU.
+
+		self._promoteToRealTime()
+
+		try:
+			self._loop.run_until_complete(self._eventLoop())
+
+		finally:
+			self._loopActiveEvent.clear()
+			self._motionCompleteEvent.set() # Don't leave any waiter blocked.
+
+	################################################################################
+	#
+	# _initialiseLoopState(self)
+	#
+	################################################################################
+
+	def _initialiseLoopState(self):
+
+		self._commandEvent = asyncio.Event()
+
+	################################################################################
+	#
+	# _eventLoop(self)
+	#
+	################################################################################
 
-		self._logger.debug(f"Starting eventLoop_()")
+	async def _eventLoop(self):
 
-		self._motionCompleteEvent.set()
+		self._logger.debug("Starting eventLoop_()")
 
 		# We handle both the receipt of incoming commands and instigating actual
 		# motion in this event loop. This makes accessing state a little less complicated
 		# as the commands are simply channelled here via a thread-safe command queue.
 		#
 		# Note that when there is no motion to be enacted, and no commands to execute,
-		# we just block awaiting for something to appear in the command queue rather than
-		# spin the CPU. Any further motion can only occur via a received command.
+		# we just await a command arriving in the command queue rather than spin the
+		# CPU. Any further motion can only occur via a received command.
 
-		prevMoving = (int(self._prevMotorPosition) != int(self._prevTargetMotorPosition))
-		moving = (int(self._motorPosition) != int(self._targetMotorPosition))
+		prevMoving = (self._prevMotorPosition != self._prevTargetMotorPosition)
+		moving = (self._motorPosition != self._targetMotorPosition)
 
-		self._countdownTimer = self._idlingReportCountdownTimer
+		onestep = self._stepperMotor.onestep # Bound once, being called every step.
+
+		self._reportDeadline = time.monotonic() + self._idlingReportInterval
 
 		while self._looping:
 
-			if (not moving): # Not moving, so block on command queue rather than spin CPU.
+			if (not moving): # Not moving, so await a command rather than spin CPU.
+
+				if (not self._commandQueue):
 
+					# Any command queued after this clear() also sets the event (after
+					# having been appended), so we can't miss one.
 
-				try:
-					# Can block, which is fine, as there's no motion in progress.
-					# We do however use a timeout as we still have the responsibility
-					# of issuing positional/state reports regularly.
+					self._commandEvent.clear()
 
-					command = self._commandQueue.get(timeout = self._idlingReportInterval)
-					self._executeCommandSafely(command)
+					try:
+						# Can wait, which is fine, as there's no motion in progress.
+						# We do however wait no longer than our next report is due as we
+						# still have the responsibility of issuing positional/state reports
+						# regularly (nor beyond when the motor is due to be released).
+
+						deadline = self._reportDeadline if (self._releaseDeadline is None) else min(self._reportDeadline, self._releaseDeadline)
+						timeout = max(0.0, deadline - time.monotonic())
+						await asyncio.wait_for(self._commandEvent.wait(), timeout = timeout)
+
+					except asyncio.TimeoutError: # Timed out.
+						# Just means there were no incoming commands and we got tired of waiting.
+						pass
+
+					if (not self._looping): # Woken to stop, so don't act on anything else.
+						break
+
+				if (self._releaseDeadline is not None) and (time.monotonic() >= self._releaseDeadline):
+					self._stepperMotor.release() # Held long enough, so stop motor getting toasty.
+					self._releaseDeadline = None
+					self._logger.debug("Released motor.")
 
-				except queue.Empty: # Timed out.
-					# Just means there were no incoming commands and we got tired of waiting.
-					pass
+				if (self._commandQueue):
+					self._executeCommandSafely(self._popCommand())
 
 			else:
 				# Motion is in progress, so keep it moving, but still look at the command
@@ -580,73 +1048,145 @@ class AsyncStepperMotor:
 				# motion that is in progress (e.g. "stop" that motion, or change it's
 				# direction of motion towards a new target position, etc.).
 
-				if (not self._commandQueue.empty()):
-					command = self._commandQueue.get() # Will never block as we checked beforehand.
-					self._executeCommandSafely(command)
+				if (self._commandQueue):
+					self._executeCommandSafely(self._popCommand())
+
+				# Pace the steps, sleeping only what remains until this step is due.
+				# This also yields to the event loop so that it stays responsive (e.g.
+				# to commands) while we're in motion. If we've fallen behind (e.g. at the
+				# start of a motion), pace from now rather than rushing to catch up.
+
+				now = time.monotonic()
+				remaining = self._nextStepTime - now
+
+				await asyncio.sleep(remaining if (remaining > 0.0) else 0.0)
+
+				schedule = self._schedule
+
+				if (schedule is not None) and (self._scheduleIndex < len(schedule)):
+					stepPeriod = schedule[self._scheduleIndex]
+					self._scheduleIndex += 1
+
+				else: # No ramp, so evenly paced.
+					stepPeriod = self._stepPeriod
+
+				self._nextStepTime = max(self._nextStepTime, now) + stepPeriod
+
+				# If needed, move the motor a bit. We're only going to move one step
+				# (or a short burst of them, if unpaced), but we need to work out in
+				# which direction. If the delta is negative, then we are going backwards,
+				# unless the motion has been set as reversed. But we keep separate the
+				# notion of logical direction (the user perspective) versus the internal
+				# notion of direction. The motor is released once the motion completes.
+				#
+				# Note: there's little to gain from compiling this path (Cython/Numba),
+				# as each step is a call into a Python driver object (an I2C transaction,
+				# or GPIO register writes) and the loop must yield to asyncio between steps.
+
+				delta = self._targetMotorPosition - self._motorPosition
+
+				if (delta): # No movement required if e.g. a halt has just been executed.
 
-				self._motorPosition += int(self._performMotionIncrement(
-					int(self._targetMotorPosition), int(self._motorPosition)
-				)) # If needed, move the motor a bit.
+					direction = self._directions[(delta < 0) ^ self._motorMotionReversed]
+					style = self._motorSteppingStyle
+
+					unpaced = (self._stepPeriod == 0.0) and (self._schedule is None)
+					noOfSteps = min(abs(delta), self._burstSize) if unpaced else 1
+
+					for _ in range(noOfSteps):
+						onestep(direction = direction, style = style)
+
+					self._motorPosition += ((delta > 0) - (delta < 0)) * noOfSteps # The logical change.
 
 			if (self._targetIdlingReportInterval != self._idlingReportInterval):
-				self._acceptNewIdlingReportingInterval()
+				self._acceptNewIdlingReportingInterval(moving)
 
 			elif (self._targetMotionReportInterval != self._motionReportInterval):
-				self._acceptNewMotionReportingInterval()
+				self._acceptNewMotionReportingInterval(moving)
 
 			# If motion is in progress, then our rate of reporting status
 			# differs from that when there is no motion. Hence, we select
-			# which countdown timer to use for reporting point-in-time
-			# determination depending upon whether in motion or not.
+			# which interval the next report deadline is based upon depending
+			# upon whether in motion or not.
 			#
-			# When comparing positions, cast to int to ensure that we are
-			# actually doing an integer comparison, otherwise if it evaluates
-			# to a floating point comparison, we may never appear to reach
-			# the target position. All positions are notionally integral,
-			# so ensure we treat them as such.
+			# Positions are ints (see _moveBy()/_moveTo()), so this is an
+			# exact integer comparison and we will always reach the target.
 
-			moving = (int(self._motorPosition) != int(self._targetMotorPosition))
+			moving = (self._motorPosition != self._targetMotorPosition)
 
 			if (not prevMoving and moving):
 
 				self._motionCompleteEvent.clear() # Motion is now in progress, so not complete.
+				self._releaseDeadline = None # The coils are in use again.
 
-				self._motionReportCountdownTimer.restart()
-				self._countdownTimer = self._motionReportCountdownTimer
+				self._reportDeadline = time.monotonic() + self._motionReportInterval
 
 			elif (prevMoving and not moving):
 
 				# Motion is finished, we've reached our target. Ensure that the
 				# final destination is reported and that power to the stepper
-				# motor is released.
+				# motor is released (once it has been held for a while).
 
 				self._onPositionUpdate(self._targetMotorPosition, self._motorPosition)
-				self._stepperMotor.release() # Finished moving, so stop motor getting toasty.
+				self._releaseDeadline = time.monotonic() + self._holdAfterStopSecs
 
-				self._idlingReportCountdownTimer.restart()
-				self._countdownTimer = self._idlingReportCountdownTimer
+				self._reportDeadline = time.monotonic() + self._idlingReportInterval
 
-				# If client is calling wait() to retrieve the last steady-state position,
-				# then give them access to it.
+			else:
 
-				self._waitCompleteEvent.wait() # Wait for caller to finishing waiting for completion.
-				self._lastSteadyStatePosition = self._motorPosition # The item the waiter required.
-				self._motionCompleteEvent.set() # Motion is now complete.
+				now = time.monotonic()
 
-			elif (self._countdownTimer.hasExpired()): # Moving or not, report our position.
+				if (now >= self._reportDeadline): # Moving or not, report our position.
 
-				self._onPositionUpdate(self._targetMotorPosition, self._motorPosition)
-				self._countdownTimer.restart()
+					self._onPositionUpdate(self._targetMotorPosition, self._motorPosition)
+					self._reportDeadline = now + (self._motionReportInterval if moving else self._idlingReportInterval)
 
 			self._prevMotorPosition = self._motorPosition
 			self._prevTargetMotorPosition = self._targetMotorPosition
 
 			prevMoving = moving
 
-		self._logger.debug(f"Exiting eventLoop_()")
+			# Once at rest with every command (as queued before any wait()) acted
+			# upon, release any waiter with the new steady-state position.
+
+			if (not moving) and (not self._motionCompleteEvent.is_set()):
+				self._signalMotionComplete()
+
+		# Whether mid-motion, holding after a stop, or never moved at all, don't
+		# leave the coils energised once we're no longer controlling the motor.
+
+		self._stepperMotor.release()
+		self._releaseDeadline = None
+
+		self._lastSteadyStatePosition = self._motorPosition
+		self._motionCompleteEvent.set() # Don't leave any waiter blocked once stopped.
+
+		self._logger.debug("Exiting eventLoop_()")
 
 		return 0
 
+	################################################################################
+	#
+	# _promoteToRealTime(self)
+	#
+	################################################################################
+
+	def _promoteToRealTime(self):
+
+		# Applies to the calling thread only (pid 0), i.e. the StepperLoop thread.
+
+		try:
+			os.sched_setaffinity(0, {self._realTimeCpu})
+
+		except (AttributeError, OSError) as ex:
+			self._logger.info("Unable to pin control loop to CPU %s: %s", self._realTimeCpu, ex)
+
+		try:
+			os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self._realTimePriority))
+
+		except (AttributeError, OSError) as ex:
+			self._logger.info("Unable to give control loop real-time scheduling: %s", ex)
+
 	################################################################################
 	#
 	# _moveBy(self, steps)
@@ -655,7 +1195,8 @@ class AsyncStepperMotor:
 
 	def _moveBy(self, steps):
 
-		self._targetMotorPosition += steps
+		self._targetMotorPosition += int(steps) # Positions are integral.
+		self._planMotion()
 
 	################################################################################
 	#
@@ -665,7 +1206,8 @@ class AsyncStepperMotor:
 
 	def _moveTo(self, position):
 
-		self._targetMotorPosition = position
+		self._targetMotorPosition = int(position) # Positions are integral.
+		self._planMotion()
 
 	################################################################################
 	#
@@ -676,6 +1218,7 @@ class AsyncStepperMotor:
 	def _halt(self):
 
 		self._targetMotorPosition = self._motorPosition
+		self._planMotion()
 
 	################################################################################
 	#
@@ -699,14 +1242,15 @@ class AsyncStepperMotor:
 			raise Exception(f"Undefined label '{label}'.")
 
 		self._targetMotorPosition = self._markedPositions[label]
+		self._planMotion()
 
 	################################################################################
 	#
-	# _motionReportInterval(self, intervalSecs)
+	# _setMotionReportInterval(self, intervalSecs)
 	#
 	################################################################################
 
-	def _motionReportInterval(self, intervalSecs):
+	def _setMotionReportInterval(self, intervalSecs):
 
 		self._targetMotionReportInterval = intervalSecs
 
@@ -728,7 +1272,7 @@ class AsyncStepperMotor:
 
 	def _steppingStyle(self, steppingStyle):
 
-		self._motorSteppingStyle = steppingStyle
+		self._motorSteppingStyle = _steppingStyleValue(steppingStyle)
 
 	################################################################################
 	#
@@ -738,7 +1282,7 @@ class AsyncStepperMotor:
 
 	def _reverseMotion(self, reversed):
 
-		self._motorMotionReversed = reversed
+		self._motorMotionReversed = bool(reversed) # A bool, as XORed with the direction per step.
 
 	################################################################################
 	#
@@ -748,159 +1292,201 @@ class AsyncStepperMotor:
 
 	def _motionStepDelay(self, delaySecs):
 
-		raise Exception('Motion speed control not yet implemented.')
+		self._stepPeriod = max(self._minStepPeriod, delaySecs)
 
 	################################################################################
 	#
-	# _queueCommand(self, command)
+	# _motionRamp(self, rampSecs)
 	#
 	################################################################################
 
-	def _queueCommand(self, command):
+	def _motionRamp(self, rampSecs):
 
-		self._commandQueue.put(command);
-		self._logger.debug(f"Command: {command} queued.")
+		if (numpy is None):
+			raise Exception('Motion ramping requires numpy.')
+
+		self._rampPeriod = max(0.0, rampSecs)
 
 	################################################################################
 	#
-	# _executeCommandSafely(self, command)
+	# _holdAfterStop(self, holdSecs)
 	#
 	################################################################################
 
-	def _executeCommandSafely(self, command):
-
-		try:
-			command.execute()
-			self._logger.info(f"Command: {command} executed.")
+	def _holdAfterStop(self, holdSecs):
 
-		except Exception as ex:
-			self._logger.error(f"Error executing {command}: {ex}.")
+		self._holdAfterStopSecs = max(0.0, holdSecs)
 
 	################################################################################
 	#
-	# _onPositionUpdate(self, targetPosition, actualPosition)
+	# _planMotion(self)
 	#
 	################################################################################
 
-	def _onPositionUpdate(self, targetPosition, actualPosition):
+	def _planMotion(self):
 
-		try:
-			if (self._observer):
-				self._observer(targetPosition, actualPosition)
+		# Precompute the period of each step of the motion to the (new) target.
+		# A raised cosine over the motion adds the full ramp delay at either end,
+		# tapering to none midway, so the motor eases up to speed and back down.
 
-		except Exception as ex:
-			self._logger.warning(f"Position observer misbehaved: {ex}")
+		self._schedule = None
+		self._scheduleIndex = 0
 
-		except:
-			self._logger.warning(f"Position observer misbehaved.")
+		noOfSteps = abs(self._targetMotorPosition - self._motorPosition)
+
+		if (self._rampPeriod > 0.0) and (noOfSteps > 1):
+
+			phases = numpy.linspace(0.0, 2.0 * numpy.pi, noOfSteps)
+			periods = self._stepPeriod + self._rampPeriod * 0.5 * (1.0 + numpy.cos(phases))
+
+			self._schedule = periods.tolist() # Plain floats index faster, per step.
 
 	################################################################################
 	#
-	# _performMotionIncrement(self, targetPosition, currentPosition)
+	# _queueCommand(self, kind, function, args)
 	#
 	################################################################################
 
-	def _performMotionIncrement(self, targetPosition, currentPosition):
+	def _queueCommand(self, kind, function, args):
 
-		# We're only going to move one step, but we need to work out
-		# in which direction we need to move. 
+		with self._commandLock:
 
-		logicalChange = 0
+			# Where a move immediately follows a not-yet-executed move of the same
+			# kind, only the net effect matters, so fold it into that queued move
+			# (e.g. when a UI streams moves faster than the motor can follow).
 
-		noOfStepsRemaining = targetPosition - currentPosition
+			tail = self._commandQueue[-1] if self._commandQueue else None
 
-		if (noOfStepsRemaining != 0):  # Is there movement required?
+			if (tail is not None) and (tail._kind == kind):
 
-			try:
+				if (kind == _CommandKind.MOVE_TO):
+					tail._args = args
+					self._logger.debug("Command: %s coalesced.", tail)
+					return
 
-				backwards = (noOfStepsRemaining < 0)  # The logical direction (user perspective).	
-				absSteps = abs(noOfStepsRemaining)
+				if (kind == _CommandKind.MOVE_BY):
+					tail._args = (tail._args[0] + args[0],)
+					self._logger.debug("Command: %s coalesced.", tail)
+					return
 
-				# If the number of steps is negative, then we are going backwards,
-				# unless the motion has been set as reversed. But we keep separate
-				# the notion of logical direction (the user perspective) versus the
-				# internal notion of direction.
+			command = self._commandPool.rent(kind, function, args)
+			self._logger.debug("Command: %s queued.", command) # Before it could be executed and released.
 
-				if (backwards):
-					logicalChange = -1
-					actuallyBackwards = not self._motorMotionReversed
-				else:
-					logicalChange = 1
-					actuallyBackwards = self._motorMotionReversed
+			self._commandQueue.append(command)
+			self._motionCompleteEvent.clear() # Until acted upon, so wait() can't return early.
 
-				motionDirection = stepper.BACKWARD if actuallyBackwards else stepper.FORWARD
+		self._loop.call_soon_threadsafe(self._signalCommandQueued)
 
-				# Just cycling one step right now, in the determined direction.
+	################################################################################
+	#
+	# _popCommand(self)
+	#
+	################################################################################
 
-				self._stepperMotor.onestep(direction = motionDirection, style = self._motorSteppingStyle)    
+	def _popCommand(self):
 
-			finally: # Never leave the stepper motor drawing current and getting toasty.
+		with self._commandLock: # Once popped, a command can no longer be coalesced into.
+			return self._commandQueue.popleft()
 
-				if (currentPosition == targetPosition):
-					self._stepperMotor.release()
-					self._logger.debug("Released motor.")
+	################################################################################
+	#
+	# _signalMotionComplete(self)
+	#
+	################################################################################
 
-		return logicalChange
+	def _signalMotionComplete(self):
+
+		# Under the command lock, as a command queued concurrently clears the event
+		# again, and must not have that undone (we'll be back once it's acted upon).
+
+		with self._commandLock:
+			if (not self._commandQueue):
+				self._lastSteadyStatePosition = self._motorPosition # The item the waiter required.
+				self._motionCompleteEvent.set()
 
 	################################################################################
 	#
-	# _acceptNewIdlingReportingInterval(self)
+	# _signalCommandQueued(self)
 	#
 	################################################################################
 
-	def _acceptNewIdlingReportingInterval(self):
+	def _signalCommandQueued(self):
 
-		self._logger.debug(f"New (static) update interval, changed from {self._idlingReportInterval} to {self._targetIdlingReportInterval}.")
+		self._commandEvent.set() # Only ever called on the event loop.
 
-		self._idlingReportInterval = self._targetIdlingReportInterval
-		self._idlingReportCountdownTimer.period(self._idlingReportInterval)
+	################################################################################
+	#
+	# _executeCommandSafely(self, command)
+	#
+	################################################################################
 
-		self._logger.debug("Publishing position (after change to idle state) reporting interval.")
+	def _executeCommandSafely(self, command):
 
-		self._onPositionUpdate(self._targetMotorPosition, self._motorPosition)
-		self._idlingReportCountdownTimer.restart()
+		try:
+			command.execute()
+			self._logger.info("Command: %s executed.", command)
+
+		except Exception as ex:
+			self._logger.error("Error executing %s: %s.", command, ex)
+
+		finally:
+			self._commandPool.release(command)
 
 	################################################################################
 	#
-	# _acceptNewMotionReportingInterval(self)
+	# _onPositionUpdate(self, targetPosition, actualPosition)
 	#
 	################################################################################
 
-	def _acceptNewMotionReportingInterval(self):
+	def _onPositionUpdate(self, targetPosition, actualPosition):
 
-		self._logger.debug(f"New (motion) update interval, changed from {self._motionReportInterval} to {self._targetMotionReportInterval}.")
+		try:
+			if (self._observer):
+				self._observer(targetPosition, actualPosition)
 
-		self._motionReportInterval = self._targetMotionReportInterval
-		self._motionReportCountdownTimer.period(self._motionReportInterval)
+		except Exception as ex:
+			self._logger.warning("Position observer misbehaved: %s", ex)
 
-		self._logger.debug("Publishing position (after change to motion) state reporting interval).")
+		except:
+			self._logger.warning("Position observer misbehaved.")
+
+	################################################################################
+	#
+	# _acceptNewIdlingReportingInterval(self, moving)
+	#
+	################################################################################
+
+	def _acceptNewIdlingReportingInterval(self, moving):
+
+		self._logger.debug("New (static) update interval, changed from %s to %s.", self._idlingReportInterval, self._targetIdlingReportInterval)
+
+		self._idlingReportInterval = self._targetIdlingReportInterval
+
+		self._logger.debug("Publishing position (after change to idle state) reporting interval.")
 
 		self._onPositionUpdate(self._targetMotorPosition, self._motorPosition)
-		self._motionReportCountdownTimer.restart()
+
+		if (not moving):
+			self._reportDeadline = time.monotonic() + self._idlingReportInterval
 
 	################################################################################
 	#
-	# _render(self, steppingStyle)
+	# _acceptNewMotionReportingInterval(self, moving)
 	#
 	################################################################################
 
-	def _renderStepping(self, steppingStyle):
-
-		str = '?'
+	def _acceptNewMotionReportingInterval(self, moving):
 
-		if (steppingStyle == stepper.SINGLE):
-			str = "single"
+		self._logger.debug("New (motion) update interval, changed from %s to %s.", self._motionReportInterval, self._targetMotionReportInterval)
 
-		elif (steppingStyle == stepper.DOUBLE):
-			str = "double"
+		self._motionReportInterval = self._targetMotionReportInterval
 
-		elif (steppingStyle == stepper.INTERLEAVE):
-			str = "interleave"
+		self._logger.debug("Publishing position (after change to motion) state reporting interval).")
 
-		elif (steppingStyle == stepper.MICROSTEP):
-			str = "microstep"
+		self._onPositionUpdate(self._targetMotorPosition, self._motorPosition)
 
-		return str
+		if (moving):
+			self._reportDeadline = time.monotonic() + self._motionReportInterval
 
 	################################################################################
 	#
@@ -910,7 +1496,6 @@ class AsyncStepperMotor:
 
 	def __del__(self):
 
-		if (self._running):
-			self._stop()
+		if (self._running) and self._stop():
 			self._running = False
 
@@ -22,22 +22,46 @@
 #
 ####################################################################################
  
-import random
 import time
 import json
+import functools
 import queue
 import logging
 import sys
+import math
+import socket
+import threading
 import chronos
 
 from datetime import datetime
 
 from paho.mqtt import client as mqtt_client
+from paho.mqtt.matcher import MQTTMatcher
+from paho.mqtt.properties import Properties
+from paho.mqtt.packettypes import PacketTypes
 
 import SmartBlindController
 
 from adafruit_motor import stepper
 
+try:
+	import orjson
+
+except ImportError: # Optional. A faster (C) JSON decoder, if available.
+	orjson = None
+
+_jsonDecoder = json.JSONDecoder() # One decoder, reused for every command.
+
+def _decodeJson(payload): # Payloads arrive as (UTF-8) bytes.
+	return _jsonDecoder.decode(payload.decode())
+
+_loads = orjson.loads if orjson else _decodeJson # orjson parses the bytes directly.
+
+_floor = math.floor
+
+def _wholePercentage(percentage): # Rounds half up, for negatives too (unlike int(p + 0.5)).
+	return _floor(percentage + 0.5)
+
 ########################################################################################
 #
 # class MQTTSmartBlind
@@ -46,6 +70,22 @@ from adafruit_motor import stepper
 
 class MQTTSmartBlind:
 
+	# Fixed attribute set: attributes are slot lookups (not a per-instance dict)
+	# on the per-step motion and publish paths.
+
+	__slots__ = (
+		'_debugLevel', '_logger',
+		'_timestampFormat', '_timestampSecond', '_timestampPrefix',
+		'_broker', '_port', '_connectedEvent',
+		'_client', '_clientPublish', '_clientID', '_sessionExpirySecs', '_subscribeAckSecs', '_retainedProbeSecs',
+		'_blindNo', '_blindControllerID', '_topicBase', '_blindBase', '_blindBaseLen',
+		'_blindCalibrateTopic', '_blindCommandTopic', '_blindSetStateTopic',
+		'_blindPubStartMotionTopic', '_blindPubInMotionTopic', '_blindPubEndMotionTopic',
+		'_positionPayloadFormat', '_positionPayloadCache', '_lastInMotionPosition',
+		'_motionDispatch', '_routingTable', '_exactRoutes', '_exactRoute', '_inbox', '_inboxThread',
+		'_blindController', '_openIs100'
+	)
+
 	####################################################################################
 	#
 	# Initialisation
@@ -65,18 +105,30 @@ class MQTTSmartBlind:
 		self._logger = logging.getLogger('mqtt-smart-blind')
 		self._logger.setLevel(self._debugLevel)
 		
-		self._dateFormat = '%Y-%d-%m %H.%M:%S.%f'		
+		# Timestamps are '%Y-%d-%m %H.%M:%S.%f', but with the whole-second part
+		# formatted (by strftime) once per second and the microseconds appended.
+
+		self._timestampFormat = '%Y-%d-%m %H.%M:%S'
+		self._timestampSecond = None
+		self._timestampPrefix = ''
 		
 		self._broker = host
 		self._port = port
 
-		self._isConnected = False
+		self._connectedEvent = threading.Event() # Set whilst connected to the broker.
 		self._client = None
+		self._clientPublish = None # The client's publish(), bound once.
 		
 		self._blindNo = blindNo
 		self._blindControllerID = str(blindNo) if not blindID else blindID
 		
-		self._clientID = f'smartblind-session-{random.randint(0, 1000)}'  # Generate a default.
+		# A stable client ID (per host and blind), so the broker can resume our
+		# (MQTT v5) session, and so keep our queued messages, when we reconnect.
+		
+		self._clientID = f'smartblind-{socket.gethostname()}-{self._blindControllerID}'
+		self._sessionExpirySecs = 24 * 60 * 60 # Broker keeps our session this long.
+		self._subscribeAckSecs = 5.0 # How long to wait for the broker to confirm a subscription.
+		self._retainedProbeSecs = 0.1 # How long, once subscribed, to wait for a retained end position.
 
 		self._topicBase = 'home/' if not topicBase else (
 		    topicBase if (topicBase[-1]=='/') else f'{topicBase}/'
@@ -97,9 +149,48 @@ class MQTTSmartBlind:
 		self._blindPubInMotionTopic = self._blindBase + "position"
 		self._blindPubEndMotionTopic = self._blindBase + "position/end"
 
-		# Map of incoming-command representations to handlers for each.
+		# Position payloads are always the same two whole-percentage fields, so
+		# format them from a fixed template rather than json.dumps() per step.
+		# (Byte-identical to json.dumps's default output.) As bytes, so paho
+		# needn't encode each payload again before sending.
+
+		self._positionPayloadFormat = b'{"target": %d, "actual": %d}'
+
+		# With whole percentages there are few distinct payloads, so cache them by
+		# (target, actual) and skip even the formatting for repeats.
+
+		payloadFormat = self._positionPayloadFormat
+		
+		self._positionPayloadCache = functools.lru_cache(maxsize = 256)(
+			lambda target, actual: payloadFormat % (target, actual)
+		)
+
+		# The last (whole percentage) in-motion position published, so that
+		# repeated identical positions while moving are not re-published.
 
-		self._routingTable = {}
+		self._lastInMotionPosition = None
+
+		# Map of motion events to their handlers, resolved once here rather than
+		# through an if/elif chain of enum lookups on every motion update.
+
+		self._motionDispatch = {
+			SmartBlindController.MotionEvent.STARTING: self._processStartingMotion,
+			SmartBlindController.MotionEvent.MOVING: self._processMovingMotion,
+			SmartBlindController.MotionEvent.STOPPED: self._processStoppedMotion
+		}
+
+		# Map of incoming-command representations to handlers for each. A topic
+		# trie, so routes may also be MQTT filters (with '+' and '#' wildcards)
+		# and dispatch costs the depth of the topic, not the number of routes.
+
+		self._routingTable = MQTTMatcher()
+
+		# Routes without wildcards are also kept in a plain dict, keyed by their
+		# full topic, so the usual (exact) command dispatches with a single dict
+		# probe on the received topic, without first slicing off the blind base.
+
+		self._exactRoutes = {}
+		self._exactRoute = self._exactRoutes.get
 
 		# Initialisatiohow MQTT topics are mapped to blind control commands.
 		
@@ -116,17 +207,27 @@ class MQTTSmartBlind:
 		
 		self._blindController.observe(self._onMotionUpdate) # We want to observe the motion.
 
+		# Incoming messages are handed off to our own worker thread, so parsing
+		# and blind control never hold up paho's (single) network thread.
+
+		self._inbox = queue.Queue(maxsize = 1024)
+		self._inboxThread = threading.Thread(target = self._processInbox, name = 'MQTTInbox', daemon = True)
+		self._inboxThread.start()
+
 		# Connect to the MQTT broker and initiate the event loop for 
 		# talking to it.
 
 		self._client = self._connectToBroker()
+		self._clientPublish = self._client.publish
 		self._client.loop_start()
 
 		self._awaitConnection()     # Wait for the MQTT broker.
 
-		self._publishStartMotionPosition(self._client, 0, 0) # Initial publish.
-		self._publishInMotionPosition(self._client, 0, 0) # Initial publish.
-		self._publishEndMotionPosition(self._client, 0, 0) # Initial publish.
+		# The end position is retained by the broker, so (re)subscribing clients
+		# already receive the last resting position. Only publish one if the broker
+		# has none (e.g. on first ever boot).
+
+		self._publishInitialPosition()
 			
 		# username = 'emqx'
 		# password = 'public'
@@ -181,6 +282,16 @@ class MQTTSmartBlind:
 	    
 		return self._blindController.tryStop()
 		
+	####################################################################################
+	#
+	# isConnected(self) => bool
+	#
+	####################################################################################
+
+	def isConnected(self) -> bool:
+	    
+		return self._connectedEvent.is_set()
+		
 	####################################################################################
 	#
 	# run(self)
@@ -232,10 +343,15 @@ class MQTTSmartBlind:
 
 	def _registerCommand(self, command, method):
 
-		if (command in self._routingTable):
+		try:
+			self._routingTable[command]
 			raise Exception(f"Command {command} is already registered.")
+
+		except KeyError: # Not yet registered.
+			self._routingTable[command] = method
 			
-		self._routingTable[command] = method
+			if (not ('+' in command or '#' in command)):
+				self._exactRoutes[self._blindBase + command] = method
 		
 	####################################################################################
 	#
@@ -248,17 +364,88 @@ class MQTTSmartBlind:
 		# client = mqtt_client.Client(client_id,transport=’websockets’)
 		# client = mqtt_client.Client(client_id=””, clean_session=True, userdata=None, protocol = MQTTv311, transport=”tcp”)
 	
-		client = mqtt_client.Client(self._clientID)
+		client = mqtt_client.Client(self._clientID, protocol = mqtt_client.MQTTv5)
 	
 		# client.username_pw_set(username, password)    # TODO
 	
 		client.on_connect = self._onConnect
 		client.on_disconnect = self._onDisconnect
+		client.on_message = self._onMessage # Set here, as a resumed session may deliver messages straight away.
+		client.on_socket_open = self._onSocketOpen
+
+		client.reconnect_delay_set(min_delay = 1, max_delay = 16) # Backoff (secs) for dropped connections.
+		
+		properties = Properties(PacketTypes.CONNECT)
+		properties.SessionExpiryInterval = self._sessionExpirySecs
 		
-		client.connect(self._broker, self._port)
+		client.connect(self._broker, self._port, clean_start = False, properties = properties)
 		
 		return client
 
+	####################################################################################
+	#
+	# _publishInitialPosition(self)
+	#
+	####################################################################################
+
+	def _publishInitialPosition(self):
+
+		# Briefly subscribe to our own end-position topic; a broker-retained message,
+		# if any, is delivered straight after the SUBACK. So only time the probe from
+		# the SUBACK, and if that never arrives (or the subscription is refused) we
+		# can't tell, so leave any existing retained position alone.
+
+		retained = threading.Event()
+		subscribed = threading.Condition()
+		granted = {}
+		
+		def onEndPosition(client, userdata, message):
+			if (message.retain):
+				retained.set()
+
+		def onSubscribe(client, userdata, mid, grantedQoS, properties = None):
+			with subscribed:
+				granted[mid] = all((getattr(code, 'value', code) < 0x80) for code in grantedQoS)
+				subscribed.notify_all()
+
+		topic = self._blindPubEndMotionTopic
+		
+		self._client.message_callback_add(topic, onEndPosition)
+		self._client.on_subscribe = onSubscribe
+
+		rc, mid = self._client.subscribe(topic)
+
+		with subscribed:
+			acknowledged = (rc == mqtt_client.MQTT_ERR_SUCCESS) and subscribed.wait_for(
+				lambda: mid in granted, timeout = self._subscribeAckSecs
+			)
+
+		confirmed = acknowledged and granted[mid]
+
+		self._client.on_subscribe = None
+
+		if (not confirmed):
+			self._logger.warning("Unable to confirm subscription to %s, so not publishing an initial position.", topic)
+
+		elif (not retained.wait(self._retainedProbeSecs)):
+			self._publish(topic, self._makePositionPayload(0, 0), QoS = 1, retain = True)
+
+		self._client.unsubscribe(topic)
+		self._client.message_callback_remove(topic)
+
+	####################################################################################
+	#
+	# _onSocketOpen(self, client, userdata, sock)
+	#
+	####################################################################################
+
+	def _onSocketOpen(self, client, userdata, sock):
+
+		# Called by paho on each (re)connect, before the CONNECT packet. Our position
+		# payloads are small and latency matters, so don't let Nagle hold them back.
+
+		sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
 	####################################################################################
 	#
 	# _awaitConnection(self)
@@ -267,38 +454,47 @@ class MQTTSmartBlind:
 
 	def _awaitConnection(self):
 
-		while not self._isConnected:
+		# Wakes as soon as _onConnect() signals, rather than polling. The timeout
+		# only paces the progress logging.
+		
+		while not self._connectedEvent.wait(1.0):
 			self._logger.debug("Awaiting connection...")
-			time.sleep(1)
 			
 	####################################################################################
 	#
-	# _onConnect(client, userdata, flags, rc)
+	# _onConnect(client, userdata, flags, rc, properties)
 	#
 	####################################################################################
 
-	def _onConnect(self, client, userdata, flags, rc):
+	def _onConnect(self, client, userdata, flags, rc, properties = None):
 
 		if rc == 0:
 			self._logger.info("Connected to MQTT Broker!")
-			self._isConnected = True
-			
-			# (Re)subscribe whenever a connection is established.
+
+			# A resumed session holds whatever it was left with, which may predate a
+			# change of topic base, or include the initial position probe's
+			# subscription (if we died mid-probe). So drop the latter and always
+			# (re)subscribe, which is idempotent for topics already subscribed.
+
+			if (flags.get('session present')):
+				client.unsubscribe(self._blindPubEndMotionTopic)
+
 			self._subscribeToTopics(client)
+			self._connectedEvent.set()
 
 		else:
-			self._logger.error("Failed to connect, return code %d\n", rc)
+			self._logger.error("Failed to connect, return code %s", rc)
 
 	####################################################################################
 	#
-	# _onDisconnect(self, client, userdata, rc)
+	# _onDisconnect(self, client, userdata, rc, properties)
 	#
 	####################################################################################
 
-	def _onDisconnect(self, client, userdata, rc):
+	def _onDisconnect(self, client, userdata, rc, properties = None):
 
-		self._isConnected = False
-		self._logger.warning("disconnecting: reason is " +str(rc))
+		self._connectedEvent.clear()
+		self._logger.warning("disconnecting: reason is %s", rc)
 
 	####################################################################################
 	#
@@ -308,7 +504,7 @@ class MQTTSmartBlind:
 
 	def _onPublish(self, obj, topic):
 	
-		self._logger.debug("Published to {topic}.")
+		self._logger.debug("Published to %s.", topic)
 
 	####################################################################################
 	#
@@ -322,7 +518,7 @@ class MQTTSmartBlind:
 		# Also, no idea what each argument represents. Empirical tinkering
 		# has not be useful for enlightenment either.
 		
-		self._logger.info(f"Subscribed to {topic}: granted QoS of {grantedQoS}")
+		self._logger.info("Subscribed to %s: granted QoS of %s", topic, grantedQoS)
 
 	####################################################################################
 	#
@@ -344,18 +540,36 @@ class MQTTSmartBlind:
 	def _onMessage(self, client, userdata, message):
 
 		# This is a callback invoked from the MQTT client upon a message arrival.
-		# As its not our own thread, don't let any exceptions propagate (as we can't be
-		# sure how the MQTT client code will manage it, if at all and how/if we manage
-		# a context-specific message is not of its concern).
+		# Just queue it for the inbox thread and return, so paho's network loop is
+		# never blocked behind command processing.
 		
 		try:
-			self._processMessage(message);	
+			self._inbox.put_nowait((message.topic, message.payload))
 
-		except Exception as ex: # Catch all errors as its not our thread!
-			self._logger.error(f"Error processing message {message}: {ex}.")
+		except queue.Full:
+			self._logger.warning("Inbox full, dropped message on %s.", message.topic)
+			
+	####################################################################################
+	#
+	# _processInbox(self)
+	#
+	####################################################################################
 
-		except: # Catch all errors as this is not our thread!
-			self._logger.error("Error processing message {message}.")
+	def _processInbox(self):
+
+		# Runs on our own inbox thread. Don't let any exceptions escape, as one bad
+		# message must not end the processing of all subsequent ones.
+		
+		inbox = self._inbox
+		
+		while True:
+			topic, payload = inbox.get()
+			
+			try:
+				self._processMessage(topic, payload)
+
+			except Exception as ex: # Catch all errors, so the thread survives.
+				self._logger.error("Error processing message %s: %s.", topic, ex)
 			
 	####################################################################################
 	#
@@ -365,31 +579,42 @@ class MQTTSmartBlind:
 
 	def _subscribeToTopics(self, client):
 
-		self._logger.debug(f"Subscribing to topics based at {self._blindBase}")
+		self._logger.debug("Subscribing to topics based at %s", self._blindBase)
 	
 		client.subscribe(self._blindCalibrateTopic) # Incoming calibration commands.
 		client.subscribe(self._blindCommandTopic)   # Incoming normal-use motion commands.
 		client.subscribe(self._blindSetStateTopic)  # Incoming property/attribute oriented motion 
-		
-		client.on_message = self._onMessage
 	
 		# Options? QoS?
 	
 	####################################################################################
 	#
-	# _publish(self, client, topic, payload)
+	# _publish(self, topic, payload, QoS, retain)
 	#
 	####################################################################################
 
-	def _publish(self, client, topic, payload, QoS, retain):
+	def _publish(self, topic, payload, QoS, retain):
 		
-		result = client.publish(topic, payload, QoS, retain)
-		status = result[0] # result: [0, 1]
+		result = self._clientPublish(topic, payload, QoS, retain) # An MQTTMessageInfo.
 		
-		if status == 0:
-			self._logger.debug(f"Published {topic} message {payload}.")
-		else:
-			self._logger.warning(f"Failed to send to topic {topic} message {payload}.")
+		if (result.rc != mqtt_client.MQTT_ERR_SUCCESS):
+			self._logger.warning("Failed to send to topic %s message %s.", topic, payload)
+		elif (self._logger.isEnabledFor(logging.DEBUG)):
+			self._logger.debug("Published %s message %s.", topic, payload)
+
+	####################################################################################
+	#
+	# _publishBatch(self, items)
+	#
+	####################################################################################
+
+	def _publishBatch(self, items):
+
+		# Items are (topic, payload, QoS, retain), with payloads already made. Paho
+		# queues each for its network loop, so these go out together.
+		
+		for (topic, payload, QoS, retain) in items:
+			self._publish(topic, payload, QoS, retain)
 
 	####################################################################################
 	#
@@ -405,13 +630,13 @@ class MQTTSmartBlind:
 		# a context-specific message is not of its concern).
 		
 		try:
-			self._processMotionUpdate(targetPercentage, actualPercentage, motionEvent);	
+			self._processMotionUpdate(targetPercentage, actualPercentage, motionEvent)
 
 		except Exception as ex: # Catch all errors as its not our thread!
-			self._logger.error(f"Error processing blind motion update: {ex}.")
-
-		except: # Catch all errors as this is not our thread!
-			self._logger.error("Error processing motion update (target {targetPercentage}, actual {actualPercentage}).")
+			self._logger.error(
+				"Error processing motion update (target %s, actual %s): %s.",
+				targetPercentage, actualPercentage, ex
+			)
 			
 	####################################################################################
 	#
@@ -430,68 +655,81 @@ class MQTTSmartBlind:
 		# full extent of motion. This may be useful, depending upon how the MQTT topics
 		# for each are defined.
 		
-		if (motionEvent == SmartBlindController.MotionEvent.STARTING):
-			self._publishStartMotionPosition(self._client, targetPercentage, actualPercentage)
-			self._publishInMotionPosition(self._client, targetPercentage, actualPercentage)
-		
-		elif (motionEvent == SmartBlindController.MotionEvent.MOVING):
-			self._publishInMotionPosition(self._client, targetPercentage, actualPercentage)
+		handler = self._motionDispatch.get(motionEvent, self._processUnexpectedMotion)
+		handler(targetPercentage, actualPercentage, motionEvent)
 
-		elif (motionEvent == SmartBlindController.MotionEvent.STOPPED):
-			self._publishInMotionPosition(self._client, targetPercentage, actualPercentage)
-			self._publishEndMotionPosition(self._client, targetPercentage, actualPercentage)
+	####################################################################################
+	#
+	# _processStartingMotion(self, targetPercentage, actualPercentage, motionEvent)
+	#
+	####################################################################################
+
+	def _processStartingMotion(self, targetPercentage, actualPercentage, motionEvent):
+
+		# Start/end edges publish the same payload to two topics, so make it once
+		# and send both back-to-back as a batch.
 		
-		else:
-			self._logger.debug(f"Processing motion update, unexpected motion event {motionEvent}.")
-			
+		payload = self._makePositionPayload(targetPercentage, actualPercentage)
+		self._lastInMotionPosition = (_wholePercentage(targetPercentage), _wholePercentage(actualPercentage))
+		self._publishBatch([
+			(self._blindPubStartMotionTopic, payload, 0, False),
+			(self._blindPubInMotionTopic, payload, 0, False)
+		])
+
 	####################################################################################
 	#
-	# _publishStartMotionPosition(self, client, targetPercentage, actualPercentage)
+	# _processMovingMotion(self, targetPercentage, actualPercentage, motionEvent)
 	#
 	####################################################################################
 
-	def _publishStartMotionPosition(self, client, targetPercentage, actualPercentage):
-				
-		self._publish(
-			client, 
-			self._blindPubStartMotionTopic, 
-			self._makePositionPayload(targetPercentage, actualPercentage),
-			QoS = 0,  # Its not important that every bit of motion gets through.
-			retain = False
-		)
+	def _processMovingMotion(self, targetPercentage, actualPercentage, motionEvent):
+
+		# Many motor steps map to the same whole percentage, so only publish
+		# a change. Start/end edges are always published.
+		
+		# This is the per-step path, so publish directly on the client rather than
+		# via _publish(). QoS 0, as its not important that every bit of motion
+		# gets through.
+		
+		position = (_wholePercentage(targetPercentage), _wholePercentage(actualPercentage))
+		if (position != self._lastInMotionPosition):
+			self._lastInMotionPosition = position
+			
+			topic = self._blindPubInMotionTopic
+			payload = self._positionPayloadCache(*position)
+			
+			result = self._clientPublish(topic, payload, 0, False)
+			
+			if (result.rc != mqtt_client.MQTT_ERR_SUCCESS):
+				self._logger.warning("Failed to send to topic %s message %s.", topic, payload)
+			elif (self._logger.isEnabledFor(logging.DEBUG)):
+				self._logger.debug("Published %s message %s.", topic, payload)
 
 	####################################################################################
 	#
-	# _publishInMotionPosition(self, client, targetPercentage, actualPercentage)
+	# _processStoppedMotion(self, targetPercentage, actualPercentage, motionEvent)
 	#
 	####################################################################################
 
-	def _publishInMotionPosition(self, client, targetPercentage, actualPercentage):
-				
-		self._publish(
-			client, 
-			self._blindPubInMotionTopic, 
-			self._makePositionPayload(targetPercentage, actualPercentage),
-			QoS = 0,  # Its not important that every bit of motion gets through.
-			retain = False
-		)
+	def _processStoppedMotion(self, targetPercentage, actualPercentage, motionEvent):
+
+		payload = self._makePositionPayload(targetPercentage, actualPercentage)
+		self._lastInMotionPosition = (_wholePercentage(targetPercentage), _wholePercentage(actualPercentage))
+		self._publishBatch([
+			(self._blindPubInMotionTopic, payload, 0, False),
+			(self._blindPubEndMotionTopic, payload, 1, True) # End point must get through, and is retained.
+		])
 
 	####################################################################################
 	#
-	# _publishEndMotionPosition(self, client, targetPercentage, actualPercentage)
+	# _processUnexpectedMotion(self, targetPercentage, actualPercentage, motionEvent)
 	#
 	####################################################################################
 
-	def _publishEndMotionPosition(self, client, targetPercentage, actualPercentage):
-				
-		self._publish(
-			client, 
-			self._blindPubEndMotionTopic, 
-			self._makePositionPayload(targetPercentage, actualPercentage),
-			QoS = 1,  # We want the end point to get through. Dups are fine.
-			retain = False
-		)
+	def _processUnexpectedMotion(self, targetPercentage, actualPercentage, motionEvent):
 
+		self._logger.debug("Processing motion update, unexpected motion event %s.", motionEvent)
+			
 	####################################################################################
 	#
 	# _makePositionPayload(self, targetPercentage, actualPercentage)
@@ -500,26 +738,38 @@ class MQTTSmartBlind:
 
 	def _makePositionPayload(self, targetPercentage, actualPercentage):
 	
-		return json.dumps({ 
-			"target" : round(targetPercentage), # Whole percentages only.
-			"actual" : round(actualPercentage)
-		})
+		# Percentages can stray outside 0..100 (e.g. when moved beyond a calibration
+		# point), so round half up via floor rather than int(), which truncates.
+		
+		return self._positionPayloadCache(
+			_wholePercentage(targetPercentage), # Whole percentages only.
+			_wholePercentage(actualPercentage)
+		)
 	
 	####################################################################################
 	#
-	# _processMessage(self, message)
+	# _processMessage(self, topic, payload)
 	#
 	####################################################################################
 
-	def _processMessage(self, message):
+	def _processMessage(self, topic, payload):
 
-		payload = message.payload.decode() # its an encoded string, so we need to decode it.
-		self._logger.debug(f"Received topic {message.topic} with {payload}")
+		# The payload is left as (encoded) bytes: orjson parses bytes directly, and
+		# most commands don't look at it at all. Only decode it for logging.
+		
+		if (self._logger.isEnabledFor(logging.DEBUG)):
+			self._logger.debug("Received topic %s with %s", topic, payload.decode())
+
+		handler = self._exactRoute(topic)
+		
+		if (handler is not None):
+			handler(payload)
 
-		command = self._parseTopicForCommand(message.topic)		
-		self._logger.debug(f"Parsed command '{command}'")
+		else: # Not an exact route, so try any wildcard ones.
+			command = self._parseTopicForCommand(topic)		
+			self._logger.debug("Parsed command '%s'", command)
 		
-		self._executeCommand(command, payload)
+			self._executeCommand(command, payload)
 
 	####################################################################################
 	#
@@ -529,10 +779,11 @@ class MQTTSmartBlind:
 
 	def _parseTopicForCommand(self, topic):
 	
-		index = self._blindBaseLen
-		command = topic[index:]
+		# Equivalent of str.removeprefix() (python3.9+), using the cached length.
 		
-		return command
+		blindBase = self._blindBase
+		
+		return topic[self._blindBaseLen:] if topic.startswith(blindBase) else topic
 	
 	####################################################################################
 	#
@@ -542,10 +793,11 @@ class MQTTSmartBlind:
 
 	def _executeCommand(self, command, payload):
 
-		if (not (command in self._routingTable)):
+		handler = next(self._routingTable.iter_match(command), None)
+
+		if (handler is None):
 			raise Exception(f"Unexpected command {command} (with {payload}).")
 
-		handler = self._routingTable[command]
 		handler(payload)
 
 	####################################################################################
@@ -569,7 +821,7 @@ class MQTTSmartBlind:
 
 	def _executeCounterWind(self, payload):	
 	
-		params = json.loads(payload)
+		params = self._parseJson(payload)
 		steps = self._getParam(params, 'steps')
 		
 		self._blindController.counterWind(steps)
@@ -622,7 +874,7 @@ class MQTTSmartBlind:
 
 	def _executeGoTo(self, payload):
 
-		params = json.loads(payload)
+		params = self._parseJson(payload)
 		percentage = self._getParam(params, 'percentage')
 		
 		self._blindController.moveTo(percentage)
@@ -658,15 +910,10 @@ class MQTTSmartBlind:
 
 	def _executeSetSpeed(self, payload):
 
-		params = json.loads(payload)
+		params = self._parseJson(payload)
 		speed = self._getParam(params, 'factor') # 0.1 - 1.0   (arbitrary units)
 		
-		speed = _forceInRange(speed, 0.1, 1.0)
-
-		# TODO: Convert a single speed factor to an associated step delay.
-		
-		# self._blindController.motionStepDelay(self, delaySecs)
-		raise NotImplementedError("MQTTSmartBlind._executeSetSpeed not (yet) implemented.")
+		self._blindController.setSpeed(speed) # Clamps to range (and is not yet implemented).
 
 	####################################################################################
 	#
@@ -676,7 +923,7 @@ class MQTTSmartBlind:
 
 	def _executeSetPolarity(self, payload):
 
-		params = json.loads(payload)
+		params = self._parseJson(payload)
 		self._openIs100 = self._getParam(params, 'topIs100')
 		
 		self._blindController.setPolarity(self._openIs100)
@@ -687,13 +934,14 @@ class MQTTSmartBlind:
 	#
 	####################################################################################
 
-	def _parseJson(self, str):
+	def _parseJson(self, payload):
 	
 		try:
-			params = json.loads(str)
+			params = _loads(payload)
 		
 		except Exception as ex: # Add contextual (JSON specific) info so more comprehensible.
-			raise Exception(f"Failed to parse JSON '{str}': {ex}") # More intelligible.
+			text = payload.decode('utf-8', 'replace') # Raw bytes, so decode for the message only.
+			raise Exception(f"Failed to parse JSON '{text}': {ex}") # More intelligible.
 		
 		return params
 		
@@ -705,12 +953,11 @@ class MQTTSmartBlind:
 
 	def _getParam(self, params, name):
 	
-		if (not name in params):
-			raise Exception(f"Missing parameter '{name}'")
+		try:
+			return params[name] # One lookup; the miss is the exception case.
 			
-		value = params[name]
-		
-		return value
+		except KeyError:
+			raise Exception(f"Missing parameter '{name}'")
 		
 	####################################################################################
 	#
@@ -720,8 +967,14 @@ class MQTTSmartBlind:
 
 	def _addTimestamp(self, params):
 	
-		when = datetime.now().strftime(self._dateFormat)
-		params['timestamp'] = when
+		now = time.time()
+		second = int(now)
+		
+		if (second != self._timestampSecond):
+			self._timestampSecond = second
+			self._timestampPrefix = datetime.fromtimestamp(second).strftime(self._timestampFormat)
+		
+		params['timestamp'] = '%s.%06d' % (self._timestampPrefix, int((now - second) * 1000000))
 	
 	####################################################################################
 	#
@@ -735,5 +988,5 @@ class MQTTSmartBlind:
 			self._client.loop_stop()
 			
 		except:
-			self._logger.error(f"MQTTSmartBlind dtor failed.")
+			self._logger.error("MQTTSmartBlind dtor failed.")
 			pass
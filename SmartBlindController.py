@@ -28,9 +28,11 @@ import json
 import queue
 import logging
 import sys
+import math
 import chronos
 
 from enum import Enum
+from typing import Callable, Optional
 
 from datetime import datetime
 
@@ -39,6 +41,93 @@ from paho.mqtt import client as mqtt_client
 import AsyncStepperMotor
 from adafruit_motor import stepper
 
+try:
+	import numba
+
+except ImportError: # Optional. Only used to compile the position/percentage arithmetic.
+	numba = None
+
+####################################################################################
+#
+# _compiled(signature)
+#
+####################################################################################
+
+def _compiled(signature: str) -> Callable:
+
+	# With numba, compile eagerly for the given signature (cached on disk, so only
+	# the first ever import pays for it). Without, leave the function as python.
+
+	if (numba is None):
+		return lambda function: function
+
+	return numba.njit(signature, cache = True)
+
+####################################################################################
+#
+# _ignoreMotion(targetPercentage, actualPercentage, motionEvent)
+#
+####################################################################################
+
+def _ignoreMotion(targetPercentage: float, actualPercentage: float, motionEvent: 'MotionEvent') -> None:
+
+	# The observer until a real one is given, so motion updates needn't check for one.
+	
+	pass
+
+####################################################################################
+#
+# _forceInRange(value, lowest, highest)
+#
+####################################################################################
+
+def _forceInRange(value: float, lowest: float, highest: float) -> float:
+
+	return min(highest, max(lowest, value))
+
+####################################################################################
+#
+# _positionFromWholePercentage(percentage, base, span)
+#
+####################################################################################
+
+@_compiled('int64(int64, int64, int64)')
+def _positionFromWholePercentage(percentage: int, base: int, span: int) -> int:
+
+	# Exact integer arithmetic, rounded (half up) to the nearest position.
+
+	## TODO; Ensure/force in range min..max
+
+	return base + (((span * percentage) + 50) // 100)
+
+####################################################################################
+#
+# _positionFromPercentage(percentage, base, span)
+#
+####################################################################################
+
+@_compiled('int64(float64, int64, int64)')
+def _positionFromPercentage(percentage: float, base: int, span: int) -> int:
+
+	# For fractional percentages. Rounded as the above, so 40 and 40.0 agree.
+
+	## TODO; Ensure/force in range min..max
+
+	return int(math.floor(base + (span * percentage / 100.0) + 0.5)) # Positions are integral.
+
+####################################################################################
+#
+# _percentageFromPosition(position, offset, percentPerPosition)
+#
+####################################################################################
+
+@_compiled('float64(int64, float64, float64)')
+def _percentageFromPosition(position: int, offset: float, percentPerPosition: float) -> float:
+
+	## TODO; Ensure/force in range 0..100
+	
+	return (position - offset) * percentPerPosition
+
 ########################################################################################
 #
 # class MotionEvent
@@ -49,6 +138,24 @@ class MotionEvent(Enum):
 	STARTING = 1
 	MOVING = 2
 	STOPPED = 3
+
+# Bound once as plain module names, so the per-tick motion path doesn't go through
+# the Enum class attribute lookup for every position report.
+
+_EV_STARTING = MotionEvent.STARTING
+_EV_MOVING = MotionEvent.MOVING
+_EV_STOPPED = MotionEvent.STOPPED
+
+# The event for each (wasMoving, nowMoving) transition. At rest both before and
+# after means a whole (short) journey was completed between position reports (or
+# recalibration at rest), so that's reported as a new resting position.
+
+_MOTION_EVENTS = {
+	(False, True): _EV_STARTING,
+	(True, True): _EV_MOVING,
+	(True, False): _EV_STOPPED,
+	(False, False): _EV_STOPPED
+}
 	
 ####################################################################################
 #
@@ -77,10 +184,10 @@ class SmartBlindController:
 	####################################################################################
 
 	def __init__(self, 
-		blindNo = 1,
-		steppingStyle = AsyncStepperMotor.MotorSteppingStyle.DOUBLE,
-		loggingLevel = logging.NOTSET
-		):
+		blindNo: int = 1,
+		steppingStyle: AsyncStepperMotor.MotorSteppingStyle = AsyncStepperMotor.MotorSteppingStyle.DOUBLE,
+		loggingLevel: int = logging.NOTSET
+		) -> None:
 		
 		self._debugLevel = loggingLevel
 		self._logger = logging.getLogger('SmartBlindController')
@@ -103,11 +210,28 @@ class SmartBlindController:
 		
 		self._motorCurrentPosition = 0
 		
+		# The last motor positions reported, so unchanged reports (e.g. periodic
+		# ones whilst idle) can be dropped without any further work.
+		
+		self._lastTargetPosition = None
+		self._lastActualPosition = None
+		
 		self._targetPercentage = 0
 		self._actualPercentage = 0
 		
 		self._openIs100 = True # Position 100% could be top or bottom (user preference).
 		
+		# Position <=> percentage conversion constants, derived from the calibration
+		# (and polarity) only when that changes rather than on every motion update.
+		# The scale is None until calibration is complete (i.e. both points are set
+		# and differ), which _calibrated also records for command validation.
+		
+		self._calibrated = False
+		self._percentOffset = 0.0
+		self._percentScale = None
+		self._positionBase = 0
+		self._positionSpan = 0
+		
 		# Create a connection to the stepper motor and register to observe
 		# any motion of the motor as it occurs.
 
@@ -118,7 +242,13 @@ class SmartBlindController:
 		
 		self._motorController.observe(self._onMotionUpdate) # We want to observe the motion.
 
-		self._observer = None
+		self._observer = _ignoreMotion
+
+		# MOVING events are passed on at most once per this interval (STARTING and
+		# STOPPED always are), so that fast stepping doesn't flood the observer.
+
+		self._movingGate = chronos.CountdownTimer(0.05)
+		self._movingGate.start()
 			
 	####################################################################################
 	#
@@ -126,9 +256,19 @@ class SmartBlindController:
 	#
 	####################################################################################
 
-	def observe(self, observer):
+	def observe(self, observer: Optional[Callable[[float, float, MotionEvent], None]]) -> None:
 	
-		self._observer = observer
+		self._observer = observer if (observer is not None) else _ignoreMotion
+		
+	####################################################################################
+	#
+	# movingEventInterval(self, intervalSecs)
+	#
+	####################################################################################
+
+	def movingEventInterval(self, intervalSecs: float) -> None:
+	
+		self._movingGate.period(intervalSecs)
 		
 	####################################################################################
 	#
@@ -136,7 +276,7 @@ class SmartBlindController:
 	#
 	####################################################################################
 
-	def start(self):
+	def start(self) -> None:
 	    
 		self._motorController.start()
 		
@@ -146,7 +286,7 @@ class SmartBlindController:
 	#
 	####################################################################################
 
-	def stop(self):
+	def stop(self) -> None:
 	    
 		self._motorController.stop()
 		
@@ -176,7 +316,7 @@ class SmartBlindController:
 	#
 	####################################################################################
 
-	def run(self):
+	def run(self) -> None:
 
 		try:
 			self._motorController.run()  # Begin the stepper motor controller (blocking).
@@ -190,10 +330,10 @@ class SmartBlindController:
 	#
 	####################################################################################
 
-	def wind(self, noOfSteps):	
+	def wind(self, noOfSteps: int) -> None:	
 			
 		self._motorController.moveBy(noOfSteps * self._stepSize)
-		self._logger.info(f"Wind by {noOfSteps} step{'s' if (noOfSteps > 1) else ''}.")
+		self._logger.info("Wind by %s step%s.", noOfSteps, 's' if (noOfSteps > 1) else '')
 
 	####################################################################################
 	#
@@ -201,10 +341,10 @@ class SmartBlindController:
 	#
 	####################################################################################
 
-	def counterWind(self, noOfSteps):	
+	def counterWind(self, noOfSteps: int) -> None:	
 	
 		self._motorController.moveBy(noOfSteps * -self._stepSize)
-		self._logger.info(f"Counter wind by {noOfSteps} step{'s' if (noOfSteps > 1) else ''}.")
+		self._logger.info("Counter wind by %s step%s.", noOfSteps, 's' if (noOfSteps > 1) else '')
 
 	####################################################################################
 	#
@@ -212,10 +352,11 @@ class SmartBlindController:
 	#
 	####################################################################################
 
-	def setOpenedPoint(self):
+	def setOpenedPoint(self) -> None:
 
 		self._openedPosition = self._motorCurrentPosition
-		self._logger.debug(f"Set opened position to {self._openedPosition}.")
+		self._updateCalibration()
+		self._logger.debug("Set opened position to %s.", self._openedPosition)
 		
 	####################################################################################
 	#
@@ -223,10 +364,11 @@ class SmartBlindController:
 	#
 	####################################################################################
 
-	def setClosedPoint(self):
+	def setClosedPoint(self) -> None:
 
 		self._closedPosition = self._motorCurrentPosition
-		self._logger.debug(f"Set closed position to {self._closedPosition}.")
+		self._updateCalibration()
+		self._logger.debug("Set closed position to %s.", self._closedPosition)
 
 	####################################################################################
 	#
@@ -234,13 +376,13 @@ class SmartBlindController:
 	#
 	####################################################################################
 
-	def open(self):
+	def open(self) -> None:
 
-		if (self._openedPosition == None):
+		if (self._openedPosition is None):
 			raise Exception("Opened point not yet calibrated.")
 			
 		self._motorController.moveTo(self._openedPosition)
-		self._logger.debug(f"Opening blind (moving to position of {self._openedPosition}).")
+		self._logger.debug("Opening blind (moving to position of %s).", self._openedPosition)
 
 	####################################################################################
 	#
@@ -248,13 +390,13 @@ class SmartBlindController:
 	#
 	####################################################################################
 
-	def close(self):
+	def close(self) -> None:
 
-		if (self._closedPosition == None):
+		if (self._closedPosition is None):
 			raise Exception("Closed point not yet calibrated.")
 
 		self._motorController.moveTo(self._closedPosition)
-		self._logger.debug(f"Closing blind (moving to position of {self._closedPosition}).")
+		self._logger.debug("Closing blind (moving to position of %s).", self._closedPosition)
 
 	####################################################################################
 	#
@@ -262,27 +404,16 @@ class SmartBlindController:
 	#
 	####################################################################################
 
-	def moveTo(self, percentage):
-
-		if (self._openedPosition == None):
-			raise Exception("Opened point not yet calibrated.")
-
-		if (self._closedPosition == None):
-			raise Exception("Closed point not yet calibrated.")
+	def moveTo(self, percentage: float) -> None:
 
-		if (self._openedPosition == self._closedPosition): # Avoid div zero, etc.
-			raise Exception("Opened and closed points are the same.")
+		if (not self._calibrated):
+			raise Exception("Not calibrated: opened and closed points must be set and differ.")
 
-		position = self._calculatePositionFromPercentage(
-			percentage,
-			self._openedPosition,
-			self._closedPosition,
-			self._openIs100
-		)
+		position = self._calculatePositionFromPercentage(percentage)
 		
 		self._motorController.moveTo(position)
 		
-		self._logger.info(f"Moving to {percentage}%.")
+		self._logger.info("Moving to %s%%.", percentage)
 
 	####################################################################################
 	#
@@ -290,10 +421,10 @@ class SmartBlindController:
 	#
 	####################################################################################
 
-	def halt(self):
+	def halt(self) -> None:
 
 		self._motorController.halt()		
-		self._logger.info(f"Halt.")
+		self._logger.info("Halt.")
 
 	####################################################################################
 	#
@@ -301,10 +432,10 @@ class SmartBlindController:
 	#
 	####################################################################################
 
-	def stepSize(self, stepSize):	
+	def stepSize(self, stepSize: int) -> None:	
 	
 		self._stepSize = stepSize;	
-		self._logger.info(f"Set step size to {stepSize}.")
+		self._logger.info("Set step size to %s.", stepSize)
 
 	####################################################################################
 	#
@@ -312,10 +443,11 @@ class SmartBlindController:
 	#
 	####################################################################################
 
-	def setPolarity(self, openIs100):
+	def setPolarity(self, openIs100: bool) -> None:
 
 		self._openIs100 = openIs100
-		self._logger.info(f"Interpret 100% as fully " + ("open" if self._openIs100 else "closed") + ".")
+		self._updateCalibration()
+		self._logger.info("Interpret 100%% as fully %s.", "open" if self._openIs100 else "closed")
 
 	####################################################################################
 	#
@@ -323,7 +455,7 @@ class SmartBlindController:
 	#
 	####################################################################################
 
-	def setSpeed(self, speed): # 0.1 - 1.0   (arbitrary units)
+	def setSpeed(self, speed: float) -> None: # 0.1 - 1.0   (arbitrary units)
 		
 		speed = _forceInRange(speed, 0.1, 1.0)
 
@@ -338,7 +470,7 @@ class SmartBlindController:
 	#
 	####################################################################################
 
-	def _onMotionUpdate(self, targetPosition, actualPosition):
+	def _onMotionUpdate(self, targetPosition: int, actualPosition: int) -> None:
 		
 		# This is a callback invoked from the motor client upon a motion update.
 		# As its not our own thread, don't let any exceptions propagate (as we can't be
@@ -346,13 +478,10 @@ class SmartBlindController:
 		# a context-specific message is not of its concern).
 		
 		try:
-			self._processMotionUpdate(targetPosition, actualPosition);	
+			self._processMotionUpdate(targetPosition, actualPosition)
 
 		except Exception as ex: # Catch all errors as its not our thread!
-			self._logger.error(f"Error processing stepper motor motion update: {ex}.")
-
-		except: # Catch all errors as this is not our thread!
-			self._logger.error("Error processing message.")
+			self._logger.error("Error processing stepper motor motion update: %s.", ex)
 			
 	####################################################################################
 	#
@@ -360,13 +489,22 @@ class SmartBlindController:
 	#
 	####################################################################################
 
-	def _processMotionUpdate(self, targetPosition, actualPosition):
+	def _processMotionUpdate(self, targetPosition: int, actualPosition: int) -> None:
 		
 		# This is a callback invoked from the async motor controller when motion occurs.
 		
+		if ((targetPosition == self._lastTargetPosition) and (actualPosition == self._lastActualPosition)):
+			return # Nothing has changed since the last update.
+
+		self._lastTargetPosition = targetPosition
+		self._lastActualPosition = actualPosition
+		
 		self._motorCurrentPosition = actualPosition # Note how far the motor has travelled so far.
 
-		calibrating = (self._openedPosition == None) or (self._closedPosition  == None)
+		# Read calibration into locals once; this runs on every motor tick.
+		
+		percentScale = self._percentScale
+		calibrating = (percentScale is None)
 		
 		if (not calibrating):
 			
@@ -375,19 +513,10 @@ class SmartBlindController:
 			# fully-closed, hence we need to transform positions originating
 			# from the motor to a percentage.
 						
-			targetPercentage = self._calculatePercentageFromPosition(
-				targetPosition,
-				self._openedPosition,
-				self._closedPosition,
-				self._openIs100
-			)
+			percentOffset = self._percentOffset
 			
-			actualPercentage = self._calculatePercentageFromPosition(
-				actualPosition,
-				self._openedPosition,
-				self._closedPosition,
-				self._openIs100
-			)
+			targetPercentage = _percentageFromPosition(targetPosition, percentOffset, percentScale)
+			actualPercentage = _percentageFromPosition(actualPosition, percentOffset, percentScale)
 			
 			# We publish the target as well as the current position as this may be
 			# useful to any clients. It also allows a client to determine when the 
@@ -408,63 +537,64 @@ class SmartBlindController:
 			wasMoving = (prevTargetPercentage != prevActualPercentage)
 			nowMoving = (targetPercentage != actualPercentage)
 			
-			if (not wasMoving and nowMoving):
-				self._observer(targetPercentage, actualPercentage, MotionEvent.STARTING)
+			motionEvent = _MOTION_EVENTS[(wasMoving, nowMoving)]
 			
-			if (wasMoving and not nowMoving):
-				self._observer(targetPercentage, actualPercentage, MotionEvent.STOPPED)
-
-			else: # mid-journey ongoing motion.
-				self._observer(targetPercentage, actualPercentage, MotionEvent.MOVING)
+			movingGate = self._movingGate
+			
+			if ((motionEvent is not _EV_MOVING) or movingGate.hasExpired()):
+				self._observer(targetPercentage, actualPercentage, motionEvent)
+				movingGate.restart()
 			
 			self._targetPercentage = targetPercentage
 			self._actualPercentage = actualPercentage
 			
 		else:
-			self._logger.debug(f"Calibration not yet complete: Opened is {self._openedPosition}. Closed is {self._closedPosition}.")
+			self._logger.debug(
+				"Calibration not yet complete: Opened is %s. Closed is %s.",
+				self._openedPosition, self._closedPosition
+			)
 			
 	####################################################################################
 	#
-	# _calculatePositionFromPercentage(self, percentage, openedPosition, closedPosition, topIs100)
+	# _calculatePositionFromPercentage(self, percentage)
 	#
 	####################################################################################
 
-	def _calculatePositionFromPercentage(self, percentage, openedPosition, closedPosition, topIs100) -> int:
+	def _calculatePositionFromPercentage(self, percentage: float) -> int:
 	
-		max = openedPosition if topIs100 else closedPosition
-		min = closedPosition if topIs100 else openedPosition
-	
-		position = min + ((max - min) / 100.0 * percentage)	
-		
-		## TODO; Ensure/force in range min..max
-
-		return int(position) # Positions are integral.
+		if (isinstance(percentage, int)): # The usual case, so stay in integer arithmetic.
+			return _positionFromWholePercentage(percentage, self._positionBase, self._positionSpan)
+			
+		return _positionFromPercentage(percentage, self._positionBase, self._positionSpan)
 		
 	####################################################################################
 	#
-	# _calculatePercentageFromPosition(self, position, openedPosition, closedPosition, topIs100)
+	# _updateCalibration(self)
 	#
 	####################################################################################
 
-	def _calculatePercentageFromPosition(self, position, openedPosition, closedPosition, topIs100) -> float:
-	
-		max = openedPosition if topIs100 else closedPosition
-		min = closedPosition if topIs100 else openedPosition
+	def _updateCalibration(self) -> None:
+
+		# Recompute the position <=> percentage conversion constants. Position 100%
+		# is the opened point, or the closed point if the polarity is reversed.
 		
-		percentage = (position - min) / (max - min) * 100.0
+		self._calibrated = (
+			(self._openedPosition is not None) and
+			(self._closedPosition is not None) and
+			(self._openedPosition != self._closedPosition) # Avoid div zero, etc.
+		)
 		
-		## TODO; Ensure/force in range 0..100
+		if (self._calibrated):
+			maxPosition = self._openedPosition if self._openIs100 else self._closedPosition
+			minPosition = self._closedPosition if self._openIs100 else self._openedPosition
+			
+			self._percentOffset = float(minPosition)
+			self._percentScale = 100.0 / (maxPosition - minPosition)
+			self._positionBase = minPosition
+			self._positionSpan = maxPosition - minPosition
 		
-		return percentage
-
-	####################################################################################
-	#
-	# _forceInRange(self, value, min, max)
-	#
-	####################################################################################
+		else:
+			self._percentScale = None
+			self._positionSpan = 0
 
-	def _forceInRange(value, min, max):
-		result = min if value < min else value
-		result = max if value > max else value
-		return result
-		
+		self._lastTargetPosition = None # Percentages change, so don't skip the next update.
@@ -21,6 +21,11 @@
 # ----------------------------------------------------------------------------------
  
 import time
+
+# Intervals are measured on the monotonic clock, which (unlike time.time()) can't
+# jump with NTP or manual clock changes. Bound once for the polling paths.
+
+_clock = time.monotonic
  
 ####################################################################################
 #
@@ -29,43 +34,44 @@ import time
 ####################################################################################
 
 class Stopwatch:
+
+    __slots__ = ('_start', '_stop', '_accumulative', '_running')
  
-    def __init__(self):
-        self._start = time.time()
-        self._stop = self._start
-        self._accumulative = 0.0
-        self._running = False;
+    def __init__(self) -> None:
+        self._reset(False)
         
-    def start(self):
-        self._start = time.time()
+    def start(self) -> None:
+        self._start = _clock()
         self._running = True
 		
-    def stop(self):
-        self._stop = time.time()
+    def stop(self) -> None:
+        self._stop = _clock()
         elapsed = self._stop - self._start
         self._accumulative += elapsed
         self._start = self._stop
-        self._running = False;
+        self._running = False
 		
-    def elapsed(self):
-        end = time.time() if self._running else self._stop
+    def elapsed(self) -> float:
+        end = _clock() if self._running else self._stop
         elapsed = end - self._start
         return elapsed + self._accumulative
 		
-    def restart(self):
-        self._start = time.time()
-        self._stop = self._start
-        self._accumulative = 0.0
-        self._running = True;
+    def restart(self) -> None:
+        self._reset(True)
 
-    def reset(self):
-        self._start = time.time()
-        self._stop = self._start
+    def reset(self) -> None:
+        self._reset(False)
+
+    def _reset(self, running: bool) -> None:
+        now = _clock()
+        self._start = now
+        self._stop = now
         self._accumulative = 0.0
-        self._running = False;
+        self._running = running
 
-    def _now():
-        return time.time()
+    @staticmethod
+    def _now() -> float:
+        return _clock()
 
 ####################################################################################
 #
@@ -74,29 +80,48 @@ class Stopwatch:
 ####################################################################################
 
 class CountdownTimer:
+
+    # Holds an absolute deadline whilst running, so polling hasExpired() is one
+    # clock read and one compare. Whilst stopped it holds the time remaining.
+
+    __slots__ = ('_period', '_remaining', '_deadline', '_running')
  
-    def __init__(self, interval):
-        self._stopwatch = Stopwatch()
+    def __init__(self, interval: float) -> None:
         self._period = interval
+        self._remaining = interval
+        self._deadline = None
+        self._running = False
 		
-    def start(self):
-        self._stopwatch.start()
+    def start(self) -> None:
+        if not self._running:
+            self._deadline = _clock() + self._remaining
+            self._running = True
 				
-    def stop(self):
-        self._stopwatch.stop()
+    def stop(self) -> None:
+        if self._running:
+            self._remaining = self._deadline - _clock()
+            self._running = False
 
-    def remaining(self):
-        timeSpent = self._stopwatch.elapsed()
-        timeLeft = self._period - timeSpent
+    def remaining(self) -> float:
+        timeLeft = (self._deadline - _clock()) if self._running else self._remaining
         return timeLeft if (timeLeft > 0.0) else 0.0
 		
-    def hasExpired(self):
-        return self._stopwatch.elapsed() >= self._period
+    def hasExpired(self) -> bool:
+        if self._running:
+            return _clock() >= self._deadline
+        return self._remaining <= 0.0
 		
-    def period(self, interval):
+    def period(self, interval: float) -> None:
+        change = interval - self._period
         self._period = interval
+        if self._running:
+            self._deadline += change
+        else:
+            self._remaining += change
 
-    def restart(self):
-        self._stopwatch.restart()
+    def restart(self) -> None:
+        self._remaining = self._period
+        self._deadline = _clock() + self._period
+        self._running = True
+	   
 	   
-	   
\ No newline at end of file